@@ -0,0 +1,167 @@
+"""WSGI против ASGI при большом числе одновременных клиентов.
+
+    python -m benchmarks.asgi -c 64 --workers 8 --threads 32
+    python -m benchmarks.asgi --database /tmp/seeded.sqlite3 --client-delay 50
+
+-c клиентов по кругу открывают index, post_view, profile и search
+(с сессией читателя, так что кэш страниц для анонимов не работает).
+Перед каждым запросом клиент --client-delay мс «передаёт» его по
+медленной сети. Режимы:
+
+    wsgi           синхронные воркеры: запрос, включая медленного клиента,
+                   занимает один из --workers потоков
+    asgi           yatube.asgi: ожидание клиента — в цикле событий, Django —
+                   в пуле из --threads потоков
+    asgi+parallel  то же с PARALLEL_QUERIES: части профиля и страницы поста
+                   читаются параллельно
+
+Для каждого режима и страницы — запросы в секунду и задержки с момента,
+когда клиент начал запрос, включая ожидание свободного воркера.
+"""
+import argparse
+import asyncio
+import io
+import random
+import threading
+import time
+
+from .http import Runner, session_cookie, targets
+from .utils import benchmark_database, print_table, setup_django, summarize
+
+
+PAGES = ('index', 'post_view', 'profile', 'search')
+
+
+def run_wsgi(runner, urls, options):
+    workers = threading.BoundedSemaphore(options.workers)
+    latencies, errors = [], []
+
+    def client(share):
+        for target in share:
+            start = time.perf_counter()
+            with workers:
+                time.sleep(options.client_delay / 1000)
+                _, _, ok = runner.request(target)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors.append(target)
+
+    step = options.concurrency
+    threads = [threading.Thread(target=client, args=(urls[index::step],))
+               for index in range(step)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors), time.perf_counter() - start
+
+
+def run_asgi(application, cookie, urls, options):
+    latencies, errors = [], []
+
+    async def request(target):
+        path, query = target
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        await application({
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': query.encode(), 'headers': [
+                (b'host', b'localhost'), (b'cookie', cookie.encode())],
+        }, receive, send)
+        return sent[0]['status'] == 200
+
+    async def client(share):
+        for target in share:
+            start = time.perf_counter()
+            await asyncio.sleep(options.client_delay / 1000)
+            ok = await request(target)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors.append(target)
+
+    async def main():
+        await asyncio.gather(*[client(urls[index::options.concurrency])
+                               for index in range(options.concurrency)])
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return latencies, len(errors), time.perf_counter() - start
+
+
+def benchmark(options):
+    from django.conf import settings
+    from yatube.asgi import WsgiToAsgi, wsgi_application
+
+    urls = targets(random.Random(options.seed), options.requests)
+    cookie = session_cookie()
+    runner = Runner(cookie)
+    application = WsgiToAsgi(wsgi_application, options.threads)
+    modes = {
+        'wsgi': (False, lambda page: run_wsgi(runner, page, options)),
+        'asgi': (False, lambda page: run_asgi(application, cookie, page,
+                                              options)),
+        'asgi+parallel': (True, lambda page: run_asgi(
+            application, cookie, page, options)),
+    }
+    rows = []
+    for mode, (parallel, run) in modes.items():
+        settings.PARALLEL_QUERIES = parallel
+        for name in PAGES:
+            if name not in urls:
+                continue
+            for target in urls[name][:options.warmup]:
+                runner.request(target)
+            latencies, errors, wall = run(urls[name])
+            summary = summarize(latencies)
+            rows.append({'mode': mode, 'view': name,
+                         'rps': round(len(latencies) / wall, 1),
+                         'p50_ms': summary['p50_ms'],
+                         'p99_ms': summary['p99_ms'], 'errors': errors})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--database',
+                        help='Готовая заполненная база SQLite')
+    parser.add_argument('--seed-users', type=int, default=2000)
+    parser.add_argument('--seed-posts', type=int, default=20000)
+    parser.add_argument('-c', '--concurrency', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Потоков у WSGI')
+    parser.add_argument('--threads', type=int, default=32,
+                        help='Потоков в пуле ASGI')
+    parser.add_argument('--client-delay', type=float, default=20,
+                        help='Медленная сеть клиента на запрос, мс')
+    parser.add_argument('-n', '--requests', type=int, default=256,
+                        help='Запросов на страницу')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connections
+
+    if options.database:
+        connections.databases['default']['NAME'] = options.database
+        rows = benchmark(options)
+    else:
+        with benchmark_database():
+            call_command('seed', users=options.seed_users,
+                         posts=options.seed_posts, seed=options.seed,
+                         stdout=io.StringIO())
+            rows = benchmark(options)
+    print_table(rows, ['mode', 'view', 'rps', 'p50_ms', 'p99_ms', 'errors'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Каталог авторов и подсказки имён на большом числе пользователей.
+
+    python -m benchmarks.authors --seed-users 1000000
+
+Меряется подсказка по началу имени (короткий и длинный префикс) и
+глубокие страницы каталога: курсор по (date_joined, id) против прежнего
+OFFSET. В таблице — задержки и план запроса.
+"""
+import argparse
+import io
+import random
+
+from .utils import (benchmark_database, measure, print_table, setup_django,
+                    summarize)
+
+
+def cases(options):
+    """Имя -> (замеряемый вызов, queryset для плана)."""
+    from django.test import RequestFactory
+    from posts.models import User
+    from posts.paginators import CursorPaginator
+    from posts.views import author_lookup, authors_by_prefix
+
+    factory = RequestFactory()
+    usernames = list(User.objects.order_by('?').values_list(
+        'username', flat=True)[:100])
+    rng = random.Random(1)
+
+    def lookup(length):
+        def run():
+            author_lookup(factory.get(
+                '/', {'q': rng.choice(usernames)[:length]}))
+        return run, authors_by_prefix(usernames[0][:length]).order_by(
+            'username')[:10]
+
+    directory = User.objects.select_related('profile')
+    paginator = CursorPaginator(directory, options.page_size,
+                                ordering=('-date_joined', '-id'))
+    middle = User.objects.count() // 2
+    ordered = directory.order_by('-date_joined', '-id')
+    row = ordered[middle]
+    cursor = paginator.encode_cursor(row)
+    offset = ordered[middle:middle + options.page_size]
+    return {
+        'lookup 2 chars': lookup(2),
+        'lookup 8 chars': lookup(8),
+        'directory cursor': (
+            lambda: list(paginator.get_page(after=cursor)),
+            ordered.filter(paginator._seek(
+                [row.date_joined, row.pk], backwards=False))[
+                    :options.page_size + 1]),
+        'directory offset': (lambda: list(offset.all()), offset),
+    }
+
+
+def plan(queryset):
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        return ''
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def run(options):
+    rows = []
+    for name, (func, queryset) in cases(options).items():
+        rows.append(dict(query=name, plan=plan(queryset), **summarize(
+            measure(func, repeat=options.repeat))))
+    print_table(rows, ['query', 'p50_ms', 'p95_ms', 'p99_ms', 'plan'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--seed-users', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=200)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+
+    with benchmark_database():
+        call_command('seed', users=options.seed_users, posts=0, groups=0,
+                     follows=0, likes=0, comments=0, skip_search_index=True,
+                     stdout=io.StringIO())
+        run(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Пропускная способность и задержки страниц через WSGI-приложение.
+
+    python -m benchmarks.http --database /tmp/seeded.sqlite3 -c 8
+    python -m benchmarks.http --seed-posts 50000 --output before.json
+    python -m benchmarks.http --seed-posts 50000 --compare before.json
+
+Запросы идут прямо в ``yatube.wsgi.application`` из пула потоков (-c —
+число одновременных запросов), без сети и без сервера, так что меряется
+только Django, шаблоны и база. Для каждой страницы печатаются запросы в
+секунду, перцентили задержки и среднее число SQL-запросов; результат
+сохраняется в JSON, который можно сравнить с прогоном на другом коммите.
+
+Без --database страницы открываются во временной базе, заполненной
+``manage.py seed``.
+"""
+import argparse
+import datetime as dt
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from .utils import (BASE_DIR, benchmark_database, print_table, setup_django,
+                    summarize)
+
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+SEARCH_QUERIES = ('город', 'кошка', 'музыка лето', 'рецепт пирог',
+                  'python', 'горы поход', 'снег', 'новый проект')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def author_pages(pages=20):
+    """Строки запроса первых страниц списка авторов: курсор каждой
+    берётся из предыдущей, как при переходе по ссылке «дальше»."""
+    from posts.models import User
+    from posts.paginators import CursorPaginator
+    from posts.views import AUTHORS_PAGE_SIZE
+
+    paginator = CursorPaginator(User.objects.all(), AUTHORS_PAGE_SIZE,
+                                ordering=('-date_joined', '-id'))
+    queries = ['']
+    page = paginator.get_page()
+    while page.has_next() and len(queries) < pages:
+        queries.append(urlencode({'after': page.next_cursor}))
+        page = paginator.get_page(after=page.next_cursor)
+    return queries
+
+
+def targets(rng, count):
+    """Адреса для каждой страницы: популярные авторы и посты встречаются
+    чаще, как в настоящем трафике."""
+    from django.urls import reverse
+    from posts.models import Group, Post, User
+
+    authors = list(User.objects.order_by('-stats__followers_count')
+                   .values_list('username', flat=True)[:500])
+    posts = list(Post.objects.order_by('-likes_count')
+                 .values_list('author__username', 'pk')[:500])
+    groups = list(Group.objects.values_list('slug', flat=True)[:200])
+    cursors = author_pages()
+
+    def skewed(items):
+        # индекс со степенным перекосом к началу списка
+        return items[min(int(rng.paretovariate(1.2)) - 1, len(items) - 1)]
+
+    pages = {
+        'index': lambda: (reverse('index'), ''),
+        'group_posts': lambda: (
+            reverse('group_posts', args=[skewed(groups)]), ''),
+        'post_view': lambda: (reverse('post', args=skewed(posts)), ''),
+        'profile': lambda: (reverse('profile', args=[skewed(authors)]), ''),
+        'follow_index': lambda: (reverse('follow_index'), ''),
+        'search': lambda: (reverse('search_results'),
+                           urlencode({'q': rng.choice(SEARCH_QUERIES)})),
+        'all_groups': lambda: (reverse('all_groups'), ''),
+        'all_authors': lambda: (reverse('all_authors'), skewed(cursors)),
+        'followers': lambda: (reverse('followers', args=[skewed(authors)]),
+                              ''),
+        'following': lambda: (reverse('following', args=[skewed(authors)]),
+                              ''),
+    }
+    available = {
+        'group_posts': groups, 'post_view': posts, 'profile': authors,
+        'followers': authors, 'following': authors,
+    }
+    return {
+        name: [build() for _ in range(count)]
+        for name, build in pages.items() if available.get(name, True)
+    }
+
+
+def session_cookie():
+    """Сессия активного читателя для follow_index."""
+    from django.test import Client
+    from posts.models import User
+
+    reader = User.objects.order_by('-stats__following_count').first()
+    client = Client()
+    client.force_login(reader)
+    return f"sessionid={client.cookies['sessionid'].value}"
+
+
+class Runner:
+    def __init__(self, cookie):
+        from yatube.wsgi import application
+        self.application = application
+        self.cookie = cookie
+        self.local = threading.local()
+
+    def count_query(self, execute, sql, params, many, context):
+        self.local.queries += 1
+        return execute(sql, params, many, context)
+
+    def request(self, target):
+        from django.db import connection
+
+        path, query = target
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+            'QUERY_STRING': query, 'SERVER_NAME': 'localhost',
+            'HTTP_HOST': 'localhost', 'HTTP_COOKIE': self.cookie,
+            'wsgi.input': io.BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        status = []
+        self.local.queries = 0
+        start = time.perf_counter()
+        with connection.execute_wrapper(self.count_query):
+            response = self.application(
+                environ, lambda code, headers, *args: status.append(code))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, self.local.queries, status[0].startswith('200')
+
+    def run(self, urls, concurrency, warmup):
+        for target in urls[:warmup]:
+            self.request(target)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(self.request, urls))
+        wall = time.perf_counter() - start
+        report = summarize([elapsed for elapsed, _, _ in results])
+        report.update({
+            'rps': round(len(results) / wall, 1),
+            'queries': round(
+                sum(queries for _, queries, _ in results) / len(results), 1),
+            'errors': sum(1 for _, _, ok in results if not ok),
+        })
+        return report
+
+
+def compare(current, previous):
+    rows = []
+    for name, report in current['views'].items():
+        old = previous['views'].get(name)
+        if old is None:
+            continue
+        row = {'view': name}
+        for key in ('rps', 'p50_ms', 'p99_ms', 'queries'):
+            change = ((report[key] - old[key]) / old[key] * 100
+                      if old[key] else 0)
+            row[key] = f'{old[key]} -> {report[key]} ({change:+.0f}%)'
+        rows.append(row)
+    print(f"\nСравнение с {previous.get('commit')}:")
+    print_table(rows, ['view', 'rps', 'p50_ms', 'p99_ms', 'queries'])
+
+
+def benchmark(options):
+    from django.core.cache import cache
+
+    rng = random.Random(options.seed)
+    urls = targets(rng, options.requests)
+    runner = Runner(session_cookie())
+    views = {}
+    for name in options.views or urls:
+        if name not in urls:
+            print(f'{name}: нет данных для адресов, пропускаю',
+                  file=sys.stderr)
+            continue
+        if options.cold_cache:
+            cache.clear()
+        views[name] = runner.run(urls[name], options.concurrency,
+                                 options.warmup)
+    return views
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--database',
+                        help='Готовая заполненная база SQLite')
+    parser.add_argument('--seed-users', type=int, default=2000)
+    parser.add_argument('--seed-posts', type=int, default=20000)
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('-n', '--requests', type=int, default=200,
+                        help='Запросов на страницу')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--views', nargs='*',
+                        help='Только эти страницы (имена как в отчёте)')
+    parser.add_argument('--cold-cache', action='store_true',
+                        help='Очищать кэш перед каждой страницей')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output',
+                        help='JSON с результатом, по умолчанию '
+                             'benchmarks/results/http-<коммит>.json')
+    parser.add_argument('--compare', help='JSON прошлого прогона')
+    options = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connections
+
+    if options.database:
+        connections.databases['default']['NAME'] = options.database
+        views = benchmark(options)
+    else:
+        with benchmark_database():
+            call_command('seed', users=options.seed_users,
+                         posts=options.seed_posts, seed=options.seed,
+                         stdout=io.StringIO())
+            views = benchmark(options)
+
+    result = {
+        'commit': git_commit(),
+        'created': dt.datetime.now().isoformat(timespec='seconds'),
+        'options': {key: value for key, value in vars(options).items()
+                    if key not in ('output', 'compare')},
+        'views': views,
+    }
+    print_table([{'view': name, **report} for name, report in views.items()],
+                ['view', 'rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms',
+                 'queries', 'errors'])
+
+    output = options.output or os.path.join(
+        RESULTS_DIR, f"http-{result['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    print(f'\nРезультат записан в {output}')
+
+    if options.compare:
+        with open(options.compare) as file:
+            compare(result, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Варианты миниатюр: время кодирования и размер файла.
+
+    python -m benchmarks.images --width 4000 --height 3000
+
+На синтетическом «фото» (градиент с шумом, сжимается примерно как
+настоящая фотография) меряет для каждой миниатюры из VARIANTS и каждой
+ширины время уменьшения и кодирования в JPEG и WebP и размер результата
+в сравнении с исходным JPEG.
+"""
+import argparse
+from io import BytesIO
+
+from .utils import measure, print_table, setup_django, summarize
+
+
+def synthetic_photo(width, height):
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    return Image.merge('RGB', (
+        gradient, noise, Image.blend(gradient, noise, 0.5)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from posts.thumbnails import FORMATS, VARIANTS, _encode, _resize
+
+    photo = synthetic_photo(args.width, args.height)
+    buffer = BytesIO()
+    photo.save(buffer, 'JPEG', quality=90)
+    original_size = len(buffer.getvalue())
+    print(f'Оригинал {args.width}x{args.height}: '
+          f'{original_size // 1024} КБ JPEG')
+
+    rows = []
+    for spec, variant in VARIANTS.items():
+        largest, height = variant['size']
+        for width in variant['widths']:
+            size = (width, height and round(height * width / largest))
+            resized = _resize(photo, size)
+            for extension in FORMATS:
+                samples = measure(
+                    lambda: _encode(_resize(photo, size), extension),
+                    repeat=args.repeat, warmup=1)
+                output = len(_encode(resized, extension))
+                rows.append({
+                    'variant': f'{spec}-{width}',
+                    'format': extension,
+                    'pixels': '{}x{}'.format(*resized.size),
+                    'p50_ms': summarize(samples)['p50_ms'],
+                    'size_kb': round(output / 1024, 1),
+                    'of_original': f'{output / original_size:.2%}',
+                })
+    print_table(rows, ['variant', 'format', 'pixels', 'p50_ms', 'size_kb',
+                       'of_original'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Запросы лент, подписок и лайков с составными индексами и без них.
+
+    python -m benchmarks.indexes --seed-posts 200000
+    python -m benchmarks.indexes --database /tmp/seeded.sqlite3
+
+Для каждого запроса, который выполняют страницы (первая и глубокая
+страница ленты автора и группы, комментарии поста, проверка подписки и
+лайка), меряется время с индексами из миграции 0020, затем эти индексы
+удаляются через schema_editor, время меряется ещё раз, и индексы
+создаются заново. В таблице — медианы и план запроса с индексами.
+"""
+import argparse
+import contextlib
+import io
+
+from .utils import (benchmark_database, measure, print_table, setup_django,
+                    summarize)
+
+
+def feed_indexes():
+    from posts.models import Comment, Post
+
+    return [(model, index) for model in (Post, Comment)
+            for index in model._meta.indexes
+            if index.name in ('post_author_pub_date_idx',
+                              'post_group_pub_date_idx',
+                              'comment_post_created_idx')]
+
+
+@contextlib.contextmanager
+def without_indexes():
+    """Временно удаляет индексы лент и уникальность подписок и лайков."""
+    from django.db import connection
+    from posts.models import Follow, Likes
+
+    unique = [(model, model._meta.unique_together) for model in
+              (Follow, Likes)]
+    with connection.schema_editor() as editor:
+        for model, index in feed_indexes():
+            editor.remove_index(model, index)
+        for model, together in unique:
+            editor.alter_unique_together(model, together, ())
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in feed_indexes():
+                editor.add_index(model, index)
+            for model, together in unique:
+                editor.alter_unique_together(model, (), together)
+
+
+def queries():
+    """Запросы страниц на самых «тяжёлых» авторе, группе и посте."""
+    from django.db.models import Count, Q
+    from posts.models import Comment, Follow, Likes, Post
+
+    author_id = (Post.objects.order_by().values('author')
+                 .annotate(total=Count('pk')).order_by('-total')
+                 .values_list('author', flat=True)[0])
+    group_id = (Post.objects.order_by().exclude(group=None).values('group')
+                .annotate(total=Count('pk')).order_by('-total')
+                .values_list('group', flat=True).first())
+    post_id = (Comment.objects.order_by().values('post')
+               .annotate(total=Count('pk')).order_by('-total')
+               .values_list('post', flat=True).first())
+    follow = Follow.objects.order_by('?').values_list('user', 'author')[0]
+    like = Likes.objects.order_by('?').values_list('user', 'post')[0]
+
+    def deep(feed):
+        # курсор на середину ленты, как у ?after=
+        middle = feed.count() // 2
+        pub_date, pk = feed.values_list('pub_date', 'pk')[middle]
+        return feed.filter(Q(pub_date__lt=pub_date)
+                           | Q(pub_date=pub_date, pk__lt=pk))
+
+    by_author = Post.objects.for_feed().filter(author=author_id)
+    by_group = Post.objects.for_feed().filter(group=group_id)
+    result = {
+        'profile': by_author,
+        'profile deep': deep(by_author),
+        'group_posts': by_group,
+        'group_posts deep': deep(by_group),
+        'follow exists': Follow.objects.filter(user=follow[0],
+                                               author=follow[1]),
+        'like exists': Likes.objects.filter(user=like[0], post=like[1]),
+    }
+    if post_id is not None:
+        result['post comments'] = Comment.objects.filter(
+            post=post_id).select_related('author')
+    return result
+
+
+def plan(queryset):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def run(options):
+    from django.db import connection
+
+    def page(queryset):
+        if queryset.model.__name__ in ('Follow', 'Likes'):
+            return lambda: queryset.exists()
+        return lambda: list(queryset[:options.page_size])
+
+    rows = []
+    timings = {}
+    measured = queries()
+    for name, queryset in measured.items():
+        timings[name] = summarize(measure(page(queryset),
+                                          repeat=options.repeat))['p50_ms']
+        rows.append({'query': name, 'plan': plan(queryset)
+                     if connection.vendor == 'sqlite' else ''})
+    with without_indexes():
+        for row in rows:
+            queryset = measured[row['query']]
+            before = summarize(measure(page(queryset),
+                                       repeat=options.repeat))['p50_ms']
+            after = timings[row['query']]
+            row.update(without_ms=before, with_ms=after,
+                       speedup=f'{before / after:.1f}x' if after else '-')
+    print_table(rows, ['query', 'without_ms', 'with_ms', 'speedup', 'plan'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--database',
+                        help='Готовая заполненная база SQLite')
+    parser.add_argument('--seed-users', type=int, default=5000)
+    parser.add_argument('--seed-posts', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=11)
+    parser.add_argument('--repeat', type=int, default=50)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connections
+
+    if options.database:
+        connections.databases['default']['NAME'] = options.database
+        run(options)
+    else:
+        with benchmark_database():
+            call_command('seed', users=options.seed_users,
+                         posts=options.seed_posts, comments=2,
+                         stdout=io.StringIO())
+            run(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Побочные эффекты записи в запросе против очереди задач.
+
+    python -m benchmarks.jobs --followers 2000 --writes 200
+
+Меряет время публикации поста, комментария, лайка и подписки с
+JOBS_ASYNC=False (всё в запросе) и JOBS_ASYNC=True (в запросе только
+строки Job), затем — сколько задач в секунду выполняет воркер и
+сколько задач схлопнулось по ключам. Временная база в памяти, поэтому
+воркер здесь однопоточный; пул потоков и процессов имеет смысл на
+файловой SQLite с YATUBE_SQLITE_TUNING=1 или на PostgreSQL.
+"""
+import argparse
+import random
+import threading
+import time
+
+from .utils import (benchmark_database, measure, print_table, setup_django,
+                    summarize)
+
+
+def build(followers_count, posts_count):
+    from posts.counters import recount_user_stats
+    from posts.models import Follow, Post, User
+
+    User.objects.bulk_create(
+        [User(username=f'user{i}') for i in range(followers_count + 1)])
+    users = list(User.objects.order_by('pk'))
+    author = users[0]
+    Follow.objects.bulk_create(
+        [Follow(user=user, author=author) for user in users[1:]])
+    Post.objects.bulk_create(
+        [Post(author=author, title='пост', text='текст про кошек')
+         for _ in range(posts_count)])
+    recount_user_stats()
+    return author, users[1:]
+
+
+def writes(rng, author, readers):
+    from posts.models import Comment, Follow, Post
+    from posts.views import toggle_like
+
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    def publish():
+        Post.objects.create(author=author, title='новый', text='текст')
+
+    def comment():
+        Comment.objects.create(post_id=rng.choice(post_ids),
+                               author=rng.choice(readers), text='к')
+
+    def like():
+        toggle_like(rng.choice(readers), rng.choice(post_ids))
+
+    def follow():
+        user, target = rng.sample(readers, 2)
+        _, created = Follow.objects.get_or_create(user=user, author=target)
+        if not created:
+            Follow.objects.filter(user=user, author=target).delete()
+
+    return {'post': publish, 'comment': comment, 'like': like,
+            'follow': follow}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--followers', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from posts import jobs
+    from posts.models import Job
+
+    rng = random.Random(options.seed)
+    rows = []
+    with benchmark_database():
+        author, readers = build(options.followers, options.posts)
+        for mode in ('inline', 'queued'):
+            with override_settings(JOBS_ASYNC=mode == 'queued'):
+                for name, func in writes(rng, author, readers).items():
+                    rows.append(dict(
+                        case=f'{mode}: {name}',
+                        **summarize(measure(func, options.writes))))
+        queued = Job.objects.count()
+        start = time.perf_counter()
+        done, failed = jobs.serve(1, threading.Event(), burst=True)
+        elapsed = time.perf_counter() - start
+    print_table(rows, ['case', 'count', 'mean_ms', 'p50_ms', 'p95_ms',
+                       'p99_ms'])
+    # с разогревом measure() в режиме queued записей 4 * (writes + 3)
+    print(f'\nзаписей: {4 * (options.writes + 3)}, задач: {queued}, '
+          f'выполнено: {done}, ошибок: {failed}, '
+          f'{done / elapsed:.0f} задач в секунду')
+
+
+if __name__ == '__main__':
+    main()
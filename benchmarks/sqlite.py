@@ -0,0 +1,148 @@
+"""Читатели и писатели на одной базе SQLite: настройки по умолчанию
+против профиля SQLITE_TUNING (WAL, synchronous=NORMAL, BEGIN IMMEDIATE).
+
+    python -m benchmarks.sqlite --readers 8 --writers 1 --seconds 10
+
+База — настоящий файл (в памяти журнал не ведётся), заполняется
+``manage.py seed`` один раз и копируется для каждого режима. Читатели
+открывают первые страницы ленты, профиля и комментариев, писатели
+комментируют и ставят лайки так же, как страницы. Для каждого режима —
+операции в секунду, задержки чтения и записи и число ошибок
+«database is locked». Режим pragmas — профиль без BEGIN IMMEDIATE.
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from .utils import print_table, setup_django, summarize
+
+
+def worker(kind, seconds, seed, ids, results):
+    from django.db import OperationalError, connection
+    from posts.models import Comment, Post, User
+    from posts.views import toggle_like
+
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if kind == 'read':
+                choice = rng.random()
+                if choice < 0.5:
+                    list(Post.objects.for_feed()[:11])
+                elif choice < 0.8:
+                    list(Post.objects.for_feed().filter(
+                        author=rng.choice(ids['users']))[:11])
+                else:
+                    list(Comment.objects.filter(
+                        post=rng.choice(ids['posts'])).select_related(
+                            'author')[:20])
+            elif rng.random() < 0.5:
+                Comment.objects.create(post_id=rng.choice(ids['posts']),
+                                       author_id=rng.choice(ids['users']),
+                                       text='комментарий')
+            else:
+                toggle_like(User(pk=rng.choice(ids['users'])),
+                            rng.choice(ids['posts']))
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    connection.close()
+    results.append((kind, latencies, errors))
+
+
+def run(path, sqlite_options, options):
+    from django.db import connections
+    from posts.models import Post, User
+
+    connections.close_all()
+    # тот же словарь, что у соединений: новые соединения возьмут настройки
+    connections.databases['default'].update(NAME=path,
+                                            OPTIONS=sqlite_options)
+    ids = {
+        'users': list(User.objects.values_list('pk', flat=True)),
+        'posts': list(Post.objects.values_list('pk', flat=True)[:5000]),
+    }
+    results = []
+    threads = [
+        threading.Thread(target=worker, args=(
+            kind, options.seconds, index, ids, results))
+        for index, kind in enumerate(
+            ['read'] * options.readers + ['write'] * options.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections.close_all()
+
+    row = {}
+    for kind in ('read', 'write'):
+        latencies = [value for name, values, _ in results if name == kind
+                     for value in values]
+        errors = sum(count for name, _, count in results if name == kind)
+        summary = summarize(latencies or [0])
+        row.update({
+            f'{kind}s/s': round(len(latencies) / options.seconds, 1),
+            f'{kind} p50_ms': summary['p50_ms'],
+            f'{kind} p99_ms': summary['p99_ms'],
+            f'{kind} errors': errors,
+        })
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--seed-users', type=int, default=2000)
+    parser.add_argument('--seed-posts', type=int, default=20000)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    # класс соединения выбирается при первом обращении к нему в потоке:
+    # пересоздаём соединение главного потока, дальше меняются только OPTIONS
+    connections.close_all()
+    connections.databases['default']['ENGINE'] = 'yatube.sqlite'
+    del connections['default']
+    directory = tempfile.mkdtemp(prefix='yatube-sqlite-')
+    try:
+        seeded = os.path.join(directory, 'seeded.sqlite3')
+        connections.databases['default'].update(NAME=seeded, OPTIONS={})
+        call_command('migrate', verbosity=0)
+        call_command('seed', users=options.seed_users,
+                     posts=options.seed_posts, comments=1,
+                     stdout=io.StringIO())
+        connections.close_all()
+
+        rows = []
+        modes = {
+            'default': {},
+            'pragmas': {'pragmas': settings.SQLITE_TUNING['pragmas']},
+            'tuned': settings.SQLITE_TUNING,
+        }
+        for mode, sqlite_options in modes.items():
+            path = os.path.join(directory, f'{mode}.sqlite3')
+            shutil.copy(seeded, path)
+            rows.append(dict(mode=mode,
+                             **run(path, sqlite_options, options)))
+        print_table(rows, list(rows[0]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
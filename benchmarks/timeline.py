@@ -0,0 +1,104 @@
+"""Лента подписок: fan-out при чтении против хранимой ленты.
+
+    python -m benchmarks.timeline --users 2000 --follows 30 --posts 20000
+
+Строит синтетический граф подписок со степенным распределением
+популярности авторов, затем меряет чтение первой страницы follow_index
+обоими способами и стоимость публикации поста популярным автором.
+"""
+import argparse
+import random
+from collections import defaultdict
+
+from .utils import (benchmark_database, measure, print_table, setup_django,
+                    summarize)
+
+
+def build_graph(rng, users_count, follows_per_user, posts_count):
+    from django.conf import settings
+    from posts.counters import recount_user_stats
+    from posts.models import Follow, Post, TimelineEntry, User
+
+    User.objects.bulk_create(
+        [User(username=f'user{i}') for i in range(users_count)])
+    users = list(User.objects.order_by('pk'))
+    weights = [rng.paretovariate(1.2) for _ in users]
+    follows = set()
+    for user in users:
+        for author in rng.choices(users, weights, k=follows_per_user):
+            if author.pk != user.pk:
+                follows.add((user.pk, author.pk))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user, author_id=author) for user, author in follows])
+    Post.objects.bulk_create(
+        [Post(author=rng.choices(users, weights)[0], title='пост',
+              text='текст') for _ in range(posts_count)])
+    recount_user_stats()
+
+    # то же, что сделал бы fan-out при публикации, но одной вставкой
+    followers = defaultdict(int)
+    for user, author in follows:
+        followers[author] += 1
+    by_author = defaultdict(list)
+    for post in Post.objects.values_list('pk', 'author_id', 'pub_date'):
+        by_author[post[1]].append(post)
+    timelines = defaultdict(list)
+    for user, author in follows:
+        if followers[author] <= settings.TIMELINE_FANOUT_LIMIT:
+            timelines[user] += by_author[author]
+    entries = []
+    length = settings.TIMELINE_LENGTH
+    for user, user_posts in timelines.items():
+        user_posts.sort(key=lambda post: (post[2], post[0]), reverse=True)
+        entries += [TimelineEntry(user_id=user, post_id=pk, pub_date=pub_date)
+                    for pk, _, pub_date in user_posts[:length]]
+    TimelineEntry.objects.bulk_create(entries)
+    return users, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--follows', type=int, default=30)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--readers', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    setup_django()
+    from posts.models import Post
+    from posts.timeline import fan_out_on_read, fan_out_post, timeline_posts
+
+    rng = random.Random(options.seed)
+    with benchmark_database():
+        users, weights = build_graph(rng, options.users, options.follows,
+                                     options.posts)
+        readers = rng.sample(users, min(options.readers, len(users)))
+        ordering = ('-pub_date', '-id')
+
+        def read(strategy):
+            reader = iter(readers * 2)
+            return lambda: list(strategy(next(reader)).order_by(
+                *ordering).values_list('pk', flat=True)[:10])
+
+        author = max(zip(weights, users), key=lambda pair: pair[0])[1]
+
+        def publish():
+            fan_out_post(Post.objects.create(author=author, title='новый',
+                                             text='текст'))
+
+        repeat = len(readers)
+        rows = [
+            dict(case='read: fan-out on read',
+                 **summarize(measure(read(fan_out_on_read), repeat))),
+            dict(case='read: timeline store',
+                 **summarize(measure(read(timeline_posts), repeat))),
+            dict(case=f'write: fan-out to {author.following.count()}',
+                 **summarize(measure(publish, 20, warmup=1))),
+        ]
+    print_table(rows, ['case', 'count', 'mean_ms', 'p50_ms', 'p95_ms',
+                       'p99_ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Общие помощники бенчмарков.
+
+Бенчмарки запускаются как модули из корня проекта, например
+``python -m benchmarks.timeline``, и работают во временной базе,
+создаваемой так же, как тестовая.
+"""
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database(keepdb=False):
+    """Временная база с применёнными миграциями."""
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                       serialize=False, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0,
+                                            keepdb=keepdb)
+
+
+def measure(func, repeat=50, warmup=3):
+    """Время вызовов func в миллисекундах."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(ordered, percent):
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[min(len(ordered) - 1, index)]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.mean(ordered), 3),
+        'p50_ms': round(percentile(ordered, 50), 3),
+        'p95_ms': round(percentile(ordered, 95), 3),
+        'p99_ms': round(percentile(ordered, 99), 3),
+    }
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(column)), *(len(str(row[column])) for row in rows))
+              for column in columns]
+    print('  '.join(str(column).ljust(width)
+                    for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(width)
+                        for column, width in zip(columns, widths)))
@@ -1,11 +1,13 @@
 from django.contrib import admin
 
-from .models import Follow, Post, Group, Comment, Profile, Likes
+from .models import (Follow, Post, Group, Comment, Profile, Likes, Job,
+                     RequestProfile, UserStats)
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author')
+    list_display = ('pk', 'text', 'pub_date', 'author', 'likes_count',
+                    'comments_count')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
@@ -37,4 +39,39 @@ class ProfileAdmin(admin.ModelAdmin):
 @admin.register(Likes)
 class LikesAdmin(admin.ModelAdmin):
     list_display = ('user', 'post')
-    empty_value_display = '-пусто-'
\ No newline at end of file
+    empty_value_display = '-пусто-'
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'posts_count', 'followers_count',
+                    'following_count')
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created', 'method', 'path', 'url_name', 'status',
+                    'wall_ms', 'sql_count', 'sql_ms', 'template_ms')
+    list_filter = ('url_name', 'method', 'status')
+    date_hierarchy = 'created'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('created', 'name', 'key', 'status', 'attempts',
+                    'run_after', 'duration_ms')
+    list_filter = ('name', 'status')
+    search_fields = ('key',)
+    date_hierarchy = 'created'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,103 @@
+"""Кэш лент, карточек профиля и списка групп поверх CACHES['default'].
+
+Ключи содержат версию пространства имён: чтобы сбросить, например, все
+страницы лент, достаточно увеличить версию ``feeds`` — старые ключи
+просто перестают читаться и вытесняются сами.
+"""
+import hashlib
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from yatube.routers import reading_from_replica
+
+
+FEEDS = 'feeds'
+GROUPS = 'groups'
+# страницы целиком для анонимных посетителей, см. posts.pagecache
+PAGES = 'pages'
+
+
+def profile_namespace(user_id: int) -> str:
+    return f'profile:{user_id}'
+
+
+def version(namespace: str) -> int:
+    key = f'version:{namespace}'
+    value = cache.get(key)
+    if value is None:
+        # после вытеснения начинаем не с нуля, а с текущего времени,
+        # чтобы не вернуться к ключам, записанным до вытеснения
+        value = int(time.time() * 1000)
+        if not cache.add(key, value, None):
+            value = cache.get(key, value)
+    return value
+
+
+def versions(namespaces: List[str]) -> List[int]:
+    """Версии нескольких пространств имён за одно обращение к кэшу."""
+    keys = [f'version:{namespace}' for namespace in namespaces]
+    found = cache.get_many(keys)
+    return [found[key] if key in found else version(namespace)
+            for key, namespace in zip(keys, namespaces)]
+
+
+def invalidate(namespace: str) -> None:
+    try:
+        cache.incr(f'version:{namespace}')
+    except ValueError:
+        version(namespace)
+
+
+def invalidate_on_commit(namespace: str) -> None:
+    """Сбрасывает версию после фиксации текущей транзакции: иначе
+    параллельный запрос успеет положить под новую версию ещё старые
+    данные. Вне транзакции сбрасывает сразу."""
+    transaction.on_commit(partial(invalidate, namespace))
+
+
+def _cached(namespace: str, key: str, build: Callable[[], Any],
+            timeout: int) -> Any:
+    full_key = f'{namespace}:{version(namespace)}:{key}'
+    value = cache.get(full_key)
+    if value is None:
+        value = build()
+        if reading_from_replica():
+            # реплика может ещё не видеть то, что сбросило версию: не даём
+            # устаревшей странице задержаться в кэше дольше отставания
+            timeout = min(timeout, settings.REPLICA_LAG_SECONDS)
+        cache.set(full_key, value, timeout)
+    return value
+
+
+def feed_page(feed: str, token: str,
+              build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Страница ленты: {'ids': [...], 'next': курсор, 'previous': курсор}.
+
+    Хранятся только id постов — счётчики и тексты читаются из базы
+    свежими, поэтому лайки и правки не сбрасывают этот кэш.
+    """
+    token = hashlib.md5(token.encode()).hexdigest()
+    return _cached(FEEDS, f'{feed}:{token}', build,
+                   settings.CACHE_TIMEOUTS['feed_page'])
+
+
+def profile_card(user_id: int,
+                 build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Публичная часть карточки автора: имя, описание, аватар, счётчики."""
+    return _cached(profile_namespace(user_id), 'card', build,
+                   settings.CACHE_TIMEOUTS['profile_card'])
+
+
+def group_listing(listing: str,
+                  build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Страница списка групп с числом постов и последней активностью
+    {'groups': [...]} или число групп {'count': n}. listing —
+    'all:<страница>' или 'creator:<id>:<страница>', для числа вместо
+    страницы 'count'."""
+    return _cached(GROUPS, listing, build,
+                   settings.CACHE_TIMEOUTS['group_listing'])
@@ -0,0 +1,51 @@
+"""Условные GET для лент и страницы поста.
+
+Валидатор страницы считается до тяжёлых запросов и рендеринга: посты
+страницы читаются одним запросом без JOIN и только с полями, которые
+меняются вместе с карточкой (id, автор, cache_version), к ним
+добавляются версии кэша профилей и групп и то, что зависит от зрителя.
+Совпал If-None-Match — view не вызывается, ответ 304. Валидаторы
+страниц — *_stamp в views.
+
+Last-Modified не отдаётся: удаление поста, правка профиля или группы
+не двигают время изменения оставшихся постов, и по If-Modified-Since
+браузер получил бы 304 на устаревшую страницу.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from .cache import profile_namespace, versions
+
+
+STAMP_FIELDS = ('pk', 'pub_date', 'author_id', 'cache_version')
+
+
+def viewer(request):
+    # CSRF-токен в разметке меняется при входе вместе с cookie
+    return (request.user.pk if request.user.is_authenticated else None,
+            request.META.get('CSRF_COOKIE'))
+
+
+def stamp_posts(posts, namespaces=()):
+    """Части ETag для постов страницы. Имя, аватар и счётчики автора на
+    карточке — в версии кэша его профиля."""
+    namespaces = list(namespaces) + [
+        profile_namespace(pk) for pk in sorted({post.author_id
+                                                for post in posts})]
+    return ([(post.pk, post.cache_version) for post in posts],
+            versions(namespaces))
+
+
+def conditional_page(stamp):
+    """@conditional_page(stamp): stamp(request, *args, **kwargs) возвращает
+    части ETag или None, если страницы нет, — тогда ответ, например 404,
+    отдаёт сама view."""
+    def etag(request, *args, **kwargs):
+        parts = stamp(request, *args, **kwargs)
+        if parts is None:
+            return None
+        value = repr((viewer(request), parts))
+        return hashlib.md5(value.encode()).hexdigest()
+
+    return condition(etag_func=etag)
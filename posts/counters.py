@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
+
+from .cache import PAGES, invalidate_on_commit, profile_namespace
+from .jobs import enqueue
+from .models import Comment, Follow, Likes, Post, User, UserStats
+
+
+POST_COUNTERS = {
+    'likes_count': (Likes, 'post'),
+    'comments_count': (Comment, 'post'),
+}
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def count_subquery(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    rows = rows.values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def shift_post_counters(post_id, **deltas):
+    Post.objects.filter(pk=post_id).update(
+        cache_version=F('cache_version') + 1, updated=Now(),
+        **{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def shift_user_stats(user_id, **deltas):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()})
+    invalidate_on_commit(profile_namespace(user_id))
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        # строки ещё нет — считаем её целиком, а не от нуля; при удалении
+        # не создаём: пользователь может удаляться каскадом прямо сейчас
+        recount_user_stats(User.objects.filter(pk=user_id))
+
+
+def post_counters_changed(post_id, **deltas):
+    """Сдвигает счётчики поста, а при JOBS_ASYNC ставит их пересчёт:
+    сдвиг при повторе задачи посчитался бы дважды, пересчёт — нет."""
+    if settings.JOBS_ASYNC:
+        enqueue('counters.post', key=post_id, post_id=post_id)
+    else:
+        shift_post_counters(post_id, **deltas)
+
+
+def user_stats_changed(user_id, **deltas):
+    if settings.JOBS_ASYNC:
+        enqueue('counters.user', key=user_id, user_id=user_id)
+    else:
+        shift_user_stats(user_id, **deltas)
+
+
+def _repair(queryset, counters, batch_size, **extra):
+    """Исправляет расхождения пачками по pk, возвращает исправленные pk."""
+    actual = {name: count_subquery(model, field)
+              for name, (model, field) in counters.items()}
+    drift = Q()
+    for name in counters:
+        drift |= ~Q(**{name: F(f'actual_{name}')})
+    repaired = []
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        ids = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return repaired
+        last_pk = ids[-1]
+        with transaction.atomic():
+            drifted = queryset.model.objects.filter(pk__in=ids).annotate(
+                **{f'actual_{name}': expression
+                   for name, expression in actual.items()}
+            ).filter(drift).values_list('pk', flat=True)
+            drifted = list(drifted)
+            queryset.model.objects.filter(pk__in=drifted).update(
+                **actual, **extra)
+            repaired += drifted
+
+
+def recount_posts(posts=None, batch_size=1000):
+    """Пересчитывает счётчики постов, возвращает число исправленных."""
+    if posts is None:
+        posts = Post.objects.all()
+    repaired = _repair(posts, POST_COUNTERS, batch_size,
+                       cache_version=F('cache_version') + 1, updated=Now())
+    if repaired:
+        invalidate_on_commit(PAGES)
+    return len(repaired)
+
+
+def recount_user_stats(users=None, batch_size=1000):
+    """Создаёт недостающие строки UserStats и исправляет расхождения."""
+    if users is None:
+        users = User.objects.all()
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    UserStats.objects.bulk_create([UserStats(user_id=pk) for pk in missing])
+    repaired = _repair(UserStats.objects.filter(user__in=users),
+                       USER_COUNTERS, batch_size)
+    for user_id in repaired:
+        invalidate_on_commit(profile_namespace(user_id))
+    if repaired:
+        invalidate_on_commit(PAGES)
+    return len(repaired)
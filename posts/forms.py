@@ -1,9 +1,32 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from .models import Comment, Post, Group, User, Profile
+from .thumbnails import prepare_original, schedule
 
 
-class PostForm(ModelForm):
+class ThumbnailFormMixin:
+    """Очищает загруженную картинку от метаданных и после сохранения
+    отправляет её в пул миниатюр.
+
+    При save(commit=False) файл записывается только в instance.save(),
+    поэтому миниатюры ставятся в очередь из save_m2m(), как и m2m-поля.
+    """
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return prepare_original(image)
+        return image
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        image = self.instance.image
+        if 'image' in self.changed_data and image:
+            schedule(image.name)
+
+
+class PostForm(ThumbnailFormMixin, ModelForm):
     class Meta:
         model = Post
         fields = ('title', 'group', 'text', 'image')
@@ -23,7 +46,7 @@ class GroupForm(ModelForm):
         labels = {'title': 'Название группы', 'slug': 'Адрес группы', 'description': 'Описание' }
 
 
-class ProfileForm(ModelForm):
+class ProfileForm(ThumbnailFormMixin, ModelForm):
     class Meta:
         model = Profile
         fields = ('image', 'bio')
@@ -0,0 +1,220 @@
+"""Очередь фоновых задач в таблице Job, без внешнего брокера.
+
+Побочные эффекты записи — пересчёт счётчиков, поисковый индекс,
+раскладка ленты, миниатюры — регистрируются декоратором @task, а
+сигналы ставят их через enqueue(). При JOBS_ASYNC=False (по умолчанию)
+задача выполняется сразу, в том же запросе; при JOBS_ASYNC=True
+запрос только пишет строку Job, а выполняет её ``manage.py run_jobs``.
+
+Задача с ключом идемпотентности не дублируется, пока такая же ждёт в
+очереди: десять лайков подряд дают один пересчёт счётчиков поста.
+Поэтому задачи пишутся так, чтобы повтор давал тот же результат.
+Упавшая задача повторяется с удваивающейся задержкой, после
+max_attempts попыток остаётся со статусом failed.
+"""
+import datetime as dt
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import (IntegrityError, OperationalError, connection,
+                       transaction)
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+from .profiling import percentile
+
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+# сколько задач из начала очереди перебирает claim(): соседние воркеры
+# разбирают одни и те же строки, и проигравший берёт следующую
+CLAIM_BATCH = 10
+
+
+def task(name, max_attempts=5):
+    def decorator(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, key='', delay=0, **payload):
+    """Ставит задачу в очередь, возвращает Job или None, если такая же
+    уже ждёт. Без JOBS_ASYNC выполняет задачу сразу."""
+    func, max_attempts = TASKS[name]
+    if not settings.JOBS_ASYNC:
+        func(**payload)
+        return None
+    run_after = timezone.now() + dt.timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, key=str(key), payload=json.dumps(payload),
+                max_attempts=max_attempts, run_after=run_after)
+    except IntegrityError:
+        return None
+
+
+def _requeue(job_id, **fields):
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job_id).update(status=Job.QUEUED,
+                                                 **fields)
+    except IntegrityError:
+        # пока задача выполнялась, поставили такую же: её хватит
+        Job.objects.filter(pk=job_id).delete()
+
+
+def claim():
+    """Забирает первую готовую задачу, None — если очередь пуста."""
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.QUEUED, run_after__lte=now,
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)
+    for pk in ready[:CLAIM_BATCH]:
+        # строку забирает тот, чей UPDATE её изменил
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started=now, attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Выполняет забранную задачу, возвращает True при успехе."""
+    start = time.perf_counter()
+    try:
+        func, _ = TASKS[job.name]
+        func(**json.loads(job.payload))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s %s не выполнена', job.name, job.key)
+    else:
+        error = None
+    fields = {
+        'finished': timezone.now(),
+        'duration_ms': (time.perf_counter() - start) * 1000,
+        'last_error': error or '',
+    }
+    if error is None:
+        Job.objects.filter(pk=job.pk).update(status=Job.DONE, **fields)
+    elif job.attempts < job.max_attempts:
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        _requeue(job.pk, run_after=fields['finished'] + dt.timedelta(
+            seconds=delay), **fields)
+    else:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, **fields)
+    return error is None
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, которые выполняются дольше
+    JOBS_RUNNING_TIMEOUT: их воркер, скорее всего, убит."""
+    stale_before = timezone.now() - dt.timedelta(
+        seconds=settings.JOBS_RUNNING_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING,
+                               started__lt=stale_before)
+    ids = list(stale.values_list('pk', flat=True))
+    for pk in ids:
+        _requeue(pk)
+    return len(ids)
+
+
+def work(stop, poll=1.0, burst=False):
+    """Выполняет задачи, пока не выставлен stop (threading.Event); burst —
+    до опустошения очереди. Возвращает (выполнено, не удалось)."""
+    done = failed = 0
+    while not stop.is_set():
+        try:
+            job = claim()
+            if job is not None:
+                succeeded = run(job)
+        except OperationalError:
+            # SQLite занят другим писателем — попробуем чуть позже; если
+            # не записался итог, задачу вернёт в очередь requeue_stale()
+            logger.warning('Очередь задач недоступна', exc_info=True)
+            stop.wait(poll)
+            continue
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll)
+        elif succeeded:
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def _work_in_thread(stop, poll, burst):
+    try:
+        return work(stop, poll, burst)
+    finally:
+        connection.close()
+
+
+def serve(threads, stop, poll=1.0, burst=False):
+    """Пул из threads потоков одного процесса, у каждого своё соединение
+    с базой; один поток работает прямо в вызывающем."""
+    if threads == 1:
+        return work(stop, poll, burst)
+    with ThreadPoolExecutor(max_workers=threads,
+                            thread_name_prefix='jobs') as pool:
+        futures = [pool.submit(_work_in_thread, stop, poll, burst)
+                   for _ in range(threads)]
+    results = [future.result() for future in futures]
+    return (sum(done for done, _ in results),
+            sum(failed for _, failed in results))
+
+
+def stats(since):
+    """Сводка по именам задач: сколько выполнено и не удалось с момента
+    since, сколько было повторов, время выполнения, очередь сейчас."""
+    now = timezone.now()
+    finished = Job.objects.filter(finished__gte=since)
+    durations = {}
+    for name, duration in finished.filter(status=Job.DONE).values_list(
+            'name', 'duration_ms'):
+        durations.setdefault(name, []).append(duration)
+    counts = finished.order_by().values('name').annotate(
+        done=Count('pk', filter=Q(status=Job.DONE)),
+        failed=Count('pk', filter=Q(status=Job.FAILED)),
+        retried=Count('pk', filter=Q(attempts__gt=1)),
+        avg_ms=Avg('duration_ms', filter=Q(status=Job.DONE)),
+    )
+    rows = {row['name']: row for row in counts}
+    queued = Job.objects.filter(status=Job.QUEUED).order_by().values(
+        'name').annotate(queued=Count('pk'), oldest=Min('created'))
+    for row in queued:
+        rows.setdefault(row['name'], {'name': row['name']}).update(
+            queued=row['queued'],
+            oldest_s=round((now - row['oldest']).total_seconds()))
+
+    summary = []
+    for name in sorted(rows):
+        row = rows[name]
+        values = sorted(durations.get(name, ()))
+        summary.append({
+            'name': name,
+            'done': row.get('done', 0),
+            'failed': row.get('failed', 0),
+            'retried': row.get('retried', 0),
+            'avg_ms': round(row.get('avg_ms') or 0, 1),
+            'p95_ms': round(percentile(values, 0.95), 1) if values else 0,
+            'queued': row.get('queued', 0),
+            'oldest_s': row.get('oldest_s', 0),
+        })
+    return summary
+
+
+def throughput(since):
+    """Задач в секунду, законченных с момента since."""
+    seconds = (timezone.now() - since).total_seconds()
+    finished = Job.objects.filter(finished__gte=since).count()
+    return finished / seconds if seconds > 0 else 0.0
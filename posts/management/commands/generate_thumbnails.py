@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.thumbnails import (SPECS, mark_ready, render_all, specs_for,
+                              thumbnail_name)
+
+
+def _render(args):
+    """Возвращает имя, ошибку и признак того, что миниатюры записаны."""
+    name, force = args
+    written = force or not all(
+        default_storage.exists(thumbnail_name(name, spec))
+        for spec in specs_for(name))
+    try:
+        render_all(name, force)
+    except Exception as error:
+        return name, str(error), False
+    return name, None, written
+
+
+def walk(directory):
+    directories, files = default_storage.listdir(directory)
+    for file_name in files:
+        yield f'{directory}/{file_name}'
+    for subdirectory in directories:
+        yield from walk(f'{directory}/{subdirectory}')
+
+
+class Command(BaseCommand):
+    help = ('Делает недостающие миниатюры для картинок из media/posts и '
+            'media/users в нескольких процессах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать и уже готовые миниатюры')
+
+    def handle(self, *args, workers, force, **options):
+        names = [name for directory in SPECS
+                 if default_storage.exists(directory)
+                 for name in walk(directory)]
+        # дочерние процессы не должны унаследовать открытые соединения
+        connections.close_all()
+        done = skipped = failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tasks = ((name, force) for name in names)
+            results = executor.map(_render, tasks, chunksize=16)
+            for name, error, written in results:
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                elif written:
+                    # карточки сбрасываются, только когда все размеры
+                    # действительно записаны
+                    mark_ready(name)
+                    done += 1
+                else:
+                    skipped += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово картинок: {done}, уже были готовы: {skipped}, '
+            f'с ошибкой: {failed}'))
@@ -0,0 +1,62 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import RequestProfile
+from posts.profiling import BUCKETS, slowest_queries, summarize
+
+
+class Command(BaseCommand):
+    help = ('Сводка замеров ProfilingMiddleware по именам URL: перцентили '
+            'времени ответа, SQL, шаблоны и гистограмма')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24,
+                            help='Замеры за последние N часов')
+        parser.add_argument('--url-name', help='Только одна страница')
+        parser.add_argument('--slow', type=int, default=10,
+                            help='Сколько самых медленных запросов показать')
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить замеры старше --hours')
+
+    def handle(self, *args, hours, url_name, slow, clear, **options):
+        since = timezone.now() - dt.timedelta(hours=hours)
+        if clear:
+            deleted, _ = RequestProfile.objects.filter(
+                created__lt=since).delete()
+            self.stdout.write(f'Удалено замеров: {deleted}')
+        samples = RequestProfile.objects.filter(created__gte=since)
+        if url_name:
+            samples = samples.filter(url_name=url_name)
+        summary = summarize(samples)
+        if not summary:
+            self.stdout.write('Замеров нет. Включите профилирование: '
+                              'YATUBE_PROFILING=0.1')
+            return
+
+        columns = ('url_name', 'requests', 'p50_ms', 'p95_ms', 'p99_ms',
+                   'max_ms', 'sql_count', 'sql_ms', 'template_ms')
+        widths = [max(len(column), *(len(str(row[column]))
+                                     for row in summary))
+                  for column in columns]
+        self.stdout.write('  '.join(column.ljust(width) for column, width
+                                    in zip(columns, widths)))
+        for row in summary:
+            self.stdout.write('  '.join(str(row[column]).ljust(width)
+                                        for column, width
+                                        in zip(columns, widths)))
+
+        labels = [f'≤{bound}' for bound in BUCKETS] + [f'>{BUCKETS[-1]}']
+        for row in summary:
+            self.stdout.write(f"\n{row['url_name']}, мс:")
+            top = max(row['histogram'])
+            for label, count in zip(labels, row['histogram']):
+                if count:
+                    bar = '#' * max(1, round(count / top * 40))
+                    self.stdout.write(f'  {label:>6} {count:>7} {bar}')
+
+        if slow:
+            self.stdout.write('\nСамые медленные запросы:')
+            for elapsed, name, sql in slowest_queries(samples, slow):
+                self.stdout.write(f'  {elapsed:>9.1f} мс  {name}  {sql[:200]}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        backend = get_backend()
+        backend.clear()
+        posts = Post.objects.select_related('author', 'group').order_by('pk')
+        indexed = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                backend.index(batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'Проиндексировано постов: {indexed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс {type(backend).__name__} перестроен, постов: {indexed}'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_posts, recount_user_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики лайков, комментариев, записей и '
+            'подписок и исправляет расхождения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        posts = recount_posts(batch_size=batch_size)
+        users = recount_user_stats(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено постов: {posts}, пользователей: {users}'))
@@ -0,0 +1,138 @@
+import contextlib
+import datetime as dt
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from posts import jobs
+from posts.models import Job
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из таблицы Job пулом потоков или '
+            'процессов; --stats — сводка по задачам')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int,
+                            default=settings.JOBS_THREADS,
+                            help='Потоков в каждом процессе')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Процессов-воркеров')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда очередь опустеет')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Пауза при пустой очереди, с')
+        parser.add_argument('--report', type=float, default=60,
+                            help='Писать пропускную способность раз в N '
+                                 'секунд, 0 — не писать')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать сводку за --hours и выйти')
+        parser.add_argument('--hours', type=float, default=24)
+        parser.add_argument('--purge-days', type=float,
+                            help='Удалить выполненные задачи старше N дней')
+
+    def handle(self, *args, threads, processes, burst, poll, report,
+               stats, hours, purge_days, **options):
+        if purge_days is not None:
+            deleted, _ = Job.objects.filter(
+                status=Job.DONE,
+                finished__lt=timezone.now() - dt.timedelta(days=purge_days),
+            ).delete()
+            self.stdout.write(f'Удалено задач: {deleted}')
+        if stats:
+            self.print_stats(timezone.now() - dt.timedelta(hours=hours))
+            return
+        if purge_days is not None:
+            return
+
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших задач: '
+                              f'{requeued}')
+        start = timezone.now()
+        if processes == 1 and threads == 1:
+            self.serve_here(threads, poll, burst)
+        else:
+            self.serve_pool(threads, processes, poll, burst, report)
+        elapsed = (timezone.now() - start).total_seconds()
+        finished = Job.objects.filter(finished__gte=start)
+        done = finished.filter(status=Job.DONE).count()
+        failed = finished.filter(status=Job.FAILED).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {done}, не удалось: {failed}, '
+            f'{done / elapsed if elapsed else 0:.1f} в секунду'))
+
+    def serve_here(self, threads, poll, burst):
+        stop = threading.Event()
+        with self.stopped_by_signals(stop):
+            jobs.serve(threads, stop, poll, burst)
+
+    def serve_pool(self, threads, processes, poll, burst, report):
+        if processes > 1:
+            # дочерние процессы не должны делить соединения родителя
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            workers = [context.Process(target=jobs.serve,
+                                       args=(threads, stop, poll, burst))
+                       for _ in range(processes)]
+        else:
+            stop = threading.Event()
+            workers = [threading.Thread(target=jobs.serve,
+                                        args=(threads, stop, poll, burst))]
+        with self.stopped_by_signals(stop):
+            for worker in workers:
+                worker.start()
+            since = timezone.now()
+            reported_at = time.monotonic()
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=1)
+                if report and time.monotonic() - reported_at >= report:
+                    queued = Job.objects.filter(status=Job.QUEUED).count()
+                    self.stdout.write(
+                        f'{timezone.localtime():%H:%M:%S} '
+                        f'{jobs.throughput(since):.1f} задач в секунду, '
+                        f'в очереди {queued}')
+                    since = timezone.now()
+                    reported_at = time.monotonic()
+
+    @contextlib.contextmanager
+    def stopped_by_signals(self, stop):
+        def handler(number, frame):
+            # текущие задачи доделываются, новые не забираются
+            self.stderr.write('Останавливаемся после текущих задач...')
+            stop.set()
+
+        previous = {number: signal.signal(number, handler)
+                    for number in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            yield
+        finally:
+            for number, old in previous.items():
+                signal.signal(number, old)
+
+    def print_stats(self, since):
+        summary = jobs.stats(since)
+        if not summary:
+            self.stdout.write('Задач не было')
+            return
+        columns = ('name', 'done', 'failed', 'retried', 'avg_ms', 'p95_ms',
+                   'queued', 'oldest_s')
+        widths = [max(len(column), *(len(str(row[column]))
+                                     for row in summary))
+                  for column in columns]
+        self.stdout.write('  '.join(column.ljust(width) for column, width
+                                    in zip(columns, widths)))
+        for row in summary:
+            self.stdout.write('  '.join(str(row[column]).ljust(width)
+                                        for column, width
+                                        in zip(columns, widths)))
+        self.stdout.write(
+            f'\nВ среднем {jobs.throughput(since):.2f} задач в секунду')
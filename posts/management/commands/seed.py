@@ -0,0 +1,373 @@
+import contextlib
+import datetime as dt
+import heapq
+import io
+import itertools
+import random
+import time
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts.cache import FEEDS, GROUPS, invalidate
+from posts.models import (Comment, Follow, Group, Likes, Post,
+                          TimelineEntry, User, UserStats)
+
+
+WORDS = (
+    'город', 'река', 'лето', 'зима', 'дом', 'книга', 'музыка', 'кошка',
+    'собака', 'утро', 'вечер', 'дорога', 'море', 'горы', 'лес', 'друг',
+    'работа', 'кофе', 'поезд', 'небо', 'солнце', 'дождь', 'снег', 'сад',
+    'фото', 'рецепт', 'пирог', 'велосипед', 'поход', 'концерт', 'фильм',
+    'история', 'письмо', 'окно', 'мост', 'парк', 'школа', 'праздник',
+    'новый', 'старый', 'красивый', 'тихий', 'долгий', 'первый', 'весенний',
+    'сегодня', 'вчера', 'снова', 'очень', 'почти', 'вместе', 'далеко',
+    'гулять', 'читать', 'писать', 'готовить', 'думать', 'смотреть',
+    'python', 'django', 'код', 'проект', 'ошибка', 'релиз', 'тест',
+)
+
+
+@contextlib.contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now и auto_now_add, чтобы bulk_create сохранил
+    заданные даты."""
+    saved = []
+    for model, name in fields:
+        field = model._meta.get_field(name)
+        saved.append((field, field.auto_now, field.auto_now_add))
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextlib.contextmanager
+def fast_sqlite():
+    """На время загрузки SQLite не ждёт fsync и держит индексы в памяти:
+    при сбое загрузку всё равно начинать заново."""
+    # внутри транзакции (например, в тестах) PRAGMA synchronous запрещена
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA cache_size')
+        cache_size = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -262144')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+            cursor.execute(f'PRAGMA cache_size = {int(cache_size)}')
+
+
+class Rows:
+    """pk созданных строк и их веса для выбора со степенным перекосом."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.cumulative = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def bounds(self, field='pk'):
+        """Условие на pk: строки созданы подряд, IN на миллион не нужен."""
+        return {f'{field}__range': (self.ids[0], self.ids[-1]) if self.ids
+                else (0, -1)}
+
+    def weights(self, rng, alpha):
+        self.cumulative = list(itertools.accumulate(
+            rng.paretovariate(alpha) for _ in self.ids))
+
+    def pick(self, rng, uniform=False):
+        if uniform or self.cumulative is None:
+            return rng.choice(self.ids)
+        return rng.choices(self.ids, cum_weights=self.cumulative)[0]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными для нагрузочных тестов: '
+            'популярность авторов и постов распределена по степенному '
+            'закону, при одинаковом --seed данные одинаковые. Имена '
+            'пользователей содержат --seed, так что для повторной '
+            'загрузки в ту же базу нужен другой --seed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=30,
+                            help='Подписок на пользователя в среднем')
+        parser.add_argument('--likes', type=int, default=20,
+                            help='Лайков на пользователя в среднем')
+        parser.add_argument('--comments', type=float, default=0.5,
+                            help='Комментариев на пост в среднем')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument('--skip-search-index', action='store_true')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # метки времени отсчитываются от начала текущих суток, так что
+        # в пределах дня одинаковый --seed даёт одинаковую базу
+        self.now = timezone.now().replace(hour=0, minute=0, second=0,
+                                          microsecond=0)
+        self.prefix = f"seed{options['seed']}"
+        self.started = time.monotonic()
+        # счётчики копятся по ходу генерации: пересчёт запросами по
+        # миллиону постов занял бы больше, чем сама загрузка
+        self.counts = defaultdict(Counter)
+        with fast_sqlite():
+            self.generate(options)
+        self.step('Готово')
+
+    def generate(self, options):
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'], users)
+        with explicit_dates((Post, 'pub_date'), (Post, 'updated'),
+                            (Comment, 'created')):
+            posts = self.create_posts(options['posts'], users, groups,
+                                      options['days'])
+            self.create_comments(round(options['comments'] * len(posts)),
+                                 users, posts)
+        self.create_follows(options['follows'], users)
+        self.create_likes(options['likes'], users, posts)
+
+        self.step('Счётчики')
+        self.write_counters()
+        self.step('Ленты подписок')
+        self.fill_timelines(users)
+        if not options['skip_search_index']:
+            self.step('Поисковый индекс')
+            call_command('rebuild_search_index',
+                         stdout=self.stdout if options['verbosity'] > 1
+                         else io.StringIO())
+        invalidate(FEEDS)
+        invalidate(GROUPS)
+
+    def step(self, message):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'[{elapsed:7.1f} с] {message}')
+
+    def insert(self, model, objects):
+        """bulk_create пачками, каждая пачка в своей транзакции."""
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+
+    def insert_rows(self, model, fields, rows):
+        """Связующие таблицы без моделей в памяти: executemany пачками
+        в несколько раз быстрее bulk_create. Значения в rows должны быть
+        уже в виде для базы (get_db_prep_save)."""
+        fields = [model._meta.get_field(name) for name in fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            model._meta.db_table,
+            ', '.join(field.column for field in fields),
+            ', '.join(['%s'] * len(fields)))
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+    def update_rows(self, model, fields, rows):
+        """UPDATE по pk пачками; последнее значение в строке — pk."""
+        sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+            model._meta.db_table,
+            ', '.join(f'{model._meta.get_field(name).column} = %s'
+                      for name in fields),
+            model._meta.pk.column)
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+    def created_ids(self, model, before):
+        return Rows(list(model.objects.filter(pk__gt=before).order_by(
+            'pk').values_list('pk', flat=True)))
+
+    def last_pk(self, model):
+        row = model.objects.order_by('-pk').values_list('pk').first()
+        return row[0] if row else 0
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    def create_users(self, count):
+        self.step(f'Пользователи: {count}')
+        # один хэш на всех: make_password на каждого занял бы часы
+        password = make_password('seed-password')
+        before = self.last_pk(User)
+        self.insert(User, (
+            User(username=f'{self.prefix}_user{i}', password=password,
+                 first_name=self.sentence(1).capitalize(),
+                 date_joined=self.now - dt.timedelta(
+                     seconds=self.rng.randrange(3 * 365 * 86400)))
+            for i in range(count)))
+        users = self.created_ids(User, before)
+        self.insert(UserStats, (UserStats(user_id=pk) for pk in users.ids))
+        # вес автора: у немногих очень много подписчиков и постов
+        users.weights(self.rng, 1.2)
+        return users
+
+    def create_groups(self, count, users):
+        self.step(f'Группы: {count}')
+        before = self.last_pk(Group)
+        self.insert(Group, (
+            Group(title=f'{self.sentence(2)} {self.prefix}-{i}',
+                  slug=f'{self.prefix}-group-{i}',
+                  description=self.sentence(12),
+                  creator_id=users.pick(self.rng))
+            for i in range(count)))
+        groups = self.created_ids(Group, before)
+        groups.weights(self.rng, 1.5)
+        return groups
+
+    def create_posts(self, count, users, groups, days):
+        self.step(f'Посты: {count}')
+        before = self.last_pk(Post)
+        span = days * 86400
+        # посты создаются от старых к новым, как в жизни: pk растёт
+        # вместе с pub_date
+        offsets = sorted((self.rng.randrange(span) for _ in range(count)),
+                         reverse=True)
+
+        def posts():
+            for offset in offsets:
+                author_id = users.pick(self.rng)
+                self.counts['posts'][author_id] += 1
+                yield Post(
+                    author_id=author_id,
+                    group_id=(groups.pick(self.rng)
+                              if groups.ids and self.rng.random() < 0.4
+                              else None),
+                    title=self.sentence(self.rng.randint(2, 5))[:50],
+                    text=self.sentence(self.rng.randint(10, 80)),
+                    pub_date=self.now - dt.timedelta(seconds=offset),
+                    updated=self.now - dt.timedelta(seconds=offset))
+
+        self.insert(Post, posts())
+        posts = self.created_ids(Post, before)
+        # «горячие» посты собирают большую часть лайков и комментариев
+        posts.weights(self.rng, 1.1)
+        return posts
+
+    def create_comments(self, count, users, posts):
+        self.step(f'Комментарии: {count}')
+
+        def comments():
+            for _ in range(count):
+                post_id = posts.pick(self.rng)
+                self.counts['comments'][post_id] += 1
+                yield Comment(
+                    post_id=post_id,
+                    author_id=users.pick(self.rng, uniform=True),
+                    text=self.sentence(self.rng.randint(3, 20)),
+                    created=self.now - dt.timedelta(
+                        seconds=self.rng.randrange(86400)))
+
+        self.insert(Comment, comments())
+
+    def create_follows(self, average, users):
+        self.step(f'Подписки: ~{average * len(users.ids)}')
+
+        def follows():
+            for user_id in users.ids:
+                authors = {users.pick(self.rng)
+                           for _ in range(self.rng.randint(0, 2 * average))}
+                authors.discard(user_id)
+                self.counts['following'][user_id] += len(authors)
+                for author_id in sorted(authors):
+                    self.counts['followers'][author_id] += 1
+                    yield user_id, author_id
+
+        self.insert_rows(Follow, ('user', 'author'), follows())
+
+    def create_likes(self, average, users, posts):
+        self.step(f'Лайки: ~{average * len(users.ids)}')
+
+        def likes():
+            for user_id in users.ids:
+                liked = {posts.pick(self.rng)
+                         for _ in range(self.rng.randint(0, 2 * average))}
+                for post_id in sorted(liked):
+                    self.counts['likes'][post_id] += 1
+                    yield user_id, post_id
+
+        self.insert_rows(Likes, ('user', 'post'), likes())
+
+    def write_counters(self):
+        counts = self.counts
+        post_ids = counts['likes'].keys() | counts['comments'].keys()
+        self.update_rows(Post, ('likes_count', 'comments_count'), (
+            (counts['likes'][pk], counts['comments'][pk], pk)
+            for pk in sorted(post_ids)))
+        user_ids = (counts['posts'].keys() | counts['followers'].keys()
+                    | counts['following'].keys())
+        self.update_rows(
+            UserStats, ('posts_count', 'followers_count', 'following_count'),
+            ((counts['posts'][pk], counts['followers'][pk],
+              counts['following'][pk], pk) for pk in sorted(user_ids)))
+
+    def fill_timelines(self, users):
+        """TimelineEntry новых пользователей: как если бы каждый пост
+        разложили при публикации. Для каждого автора в памяти держатся
+        только его последние TIMELINE_LENGTH постов, лента читателя —
+        слияние этих списков по авторам, на которых он подписан."""
+        limit = settings.TIMELINE_LENGTH
+        hot = set(UserStats.objects.filter(
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True))
+        recent = defaultdict(list)
+        posts = Post.objects.filter(**users.bounds('author__id')).order_by(
+            'author_id', '-pub_date', '-pk').values_list(
+            'author_id', 'pub_date', 'pk')
+        pub_date_field = TimelineEntry._meta.get_field('pub_date')
+        for author_id, pub_date, pk in posts.iterator(chunk_size=10000):
+            entries = recent[author_id]
+            if author_id not in hot and len(entries) < limit:
+                # дата приводится к виду для базы один раз на пост,
+                # а не на каждую запись в лентах
+                db_value = pub_date_field.get_db_prep_save(pub_date,
+                                                           connection)
+                entries.append((pub_date, pk, db_value))
+
+        follows = Follow.objects.filter(
+            **users.bounds('user__id'),
+        ).order_by('user_id').values_list('user_id', 'author_id')
+
+        def entries():
+            for user_id, pairs in itertools.groupby(
+                    follows.iterator(chunk_size=10000), key=itemgetter(0)):
+                merged = heapq.merge(
+                    *(recent[author_id] for _, author_id in pairs),
+                    reverse=True)
+                for _, pk, pub_date in itertools.islice(merged, limit):
+                    yield user_id, pk, pub_date
+
+        self.insert_rows(TimelineEntry, ('user', 'post', 'pub_date'),
+                         entries())
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator
+from posts.views import DEFAULT_PAGE_SIZE
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '[::1]', 'testserver')
+
+
+def default_host():
+    """Первый из ALLOWED_HOSTS, под которым сайт открывают снаружи."""
+    for host in settings.ALLOWED_HOSTS:
+        if host not in LOCAL_HOSTS and not host.startswith(('.', '*')):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = ('Прогревает кэш после деплоя: первые страницы главной, '
+            'самых активных групп и списка групп. Имеет смысл только с '
+            'общим для процессов бэкендом (YATUBE_CACHE=filebased или '
+            'memcached)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--groups', type=int, default=10)
+        # ключ кэша страницы — полный адрес, поэтому прогревать нужно тот
+        # хост и ту схему, по которым придут посетители
+        parser.add_argument('--host', default=None,
+                            help='По умолчанию первый внешний из '
+                                 'ALLOWED_HOSTS')
+        parser.add_argument('--scheme', choices=('http', 'https'),
+                            default='https')
+
+    def handle(self, *args, pages, groups, host, scheme, **options):
+        urls = self.feed_urls(reverse('index'), Post.objects.all(), pages)
+        active = Group.objects.annotate(
+            posts_total=Count('posts')).order_by('-posts_total')[:groups]
+        for group in active:
+            urls += self.feed_urls(
+                reverse('group_posts', args=[group.slug]),
+                Post.objects.filter(group=group), pages)
+        urls.append(reverse('all_groups'))
+
+        client = Client(HTTP_HOST=host or default_host())
+        failed = 0
+        for url in urls:
+            response = client.get(url, secure=scheme == 'https')
+            if response.status_code != 200:
+                failed += 1
+                self.stderr.write(f'{url}: {response.status_code}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(urls) - failed}, с ошибкой: {failed}'))
+
+    def feed_urls(self, url, post_list, pages):
+        """Адреса первых pages страниц ленты в том виде, как их строит
+        пагинатор."""
+        if settings.FEED_PAGINATION == 'offset':
+            count = -(-post_list.count() // DEFAULT_PAGE_SIZE)
+            return [url] + [f'{url}?page={number}'
+                            for number in range(2, min(pages, count) + 1)]
+        paginator = CursorPaginator(post_list, DEFAULT_PAGE_SIZE)
+        urls = [url]
+        cursor = None
+        for _ in range(pages - 1):
+            page = paginator.get_page(after=cursor)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+            urls.append(f'{url}?after={cursor}')
+        return urls
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='cache_version',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=100, verbose_name='Имя URL')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Адрес')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время')),
+                ('wall_ms', models.FloatField(verbose_name='Ответ, мс')),
+                ('sql_count', models.IntegerField(verbose_name='SQL-запросов')),
+                ('sql_ms', models.FloatField(verbose_name='SQL, мс')),
+                ('template_ms', models.FloatField(verbose_name='Шаблоны, мс')),
+                ('slow_queries', models.TextField(blank=True, verbose_name='Медленные запросы')),
+            ],
+            options={
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='requestprofile',
+            index=models.Index(fields=['url_name', 'created'], name='profile_url_name_created_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Удаляет повторные подписки и лайки, оставляя самую раннюю запись,
+    и пересчитывает затронутые счётчики."""
+    Follow = apps.get_model('posts', 'Follow')
+    Likes = apps.get_model('posts', 'Likes')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    users = set()
+    for row in (Follow.objects.values('user', 'author')
+                .annotate(keep=Min('id'), total=Count('id'))
+                .filter(total__gt=1)):
+        Follow.objects.filter(user=row['user'], author=row['author']).exclude(
+            pk=row['keep']).delete()
+        users.update((row['user'], row['author']))
+    for user_id in users:
+        UserStats.objects.filter(user_id=user_id).update(
+            followers_count=Follow.objects.filter(author=user_id).count(),
+            following_count=Follow.objects.filter(user=user_id).count())
+
+    for row in (Likes.objects.values('user', 'post')
+                .annotate(keep=Min('id'), total=Count('id'))
+                .filter(total__gt=1)):
+        Likes.objects.filter(user=row['user'], post=row['post']).exclude(
+            pk=row['keep']).delete()
+        Post.objects.filter(pk=row['post']).update(
+            likes_count=Likes.objects.filter(post=row['post']).count(),
+            cache_version=F('cache_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_requestprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('user', 'author')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='likes',
+            unique_together={('user', 'post')},
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='comment_post_created_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.6 on 2026-10-18 21:05
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_feed_indexes'),
+    ]
+
+    # модель пользователя из django.contrib.auth, её Meta не поменять:
+    # индекс для курсоров каталога авторов создаётся напрямую
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX user_date_joined_id_idx '
+            'ON auth_user (date_joined, id)',
+            'DROP INDEX user_date_joined_id_idx',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.6 on 2026-10-18 21:40
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def updated_from_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_user_date_joined_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='date updated'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(updated_from_pub_date, migrations.RunPython.noop),
+    ]
@@ -24,6 +24,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно карточке поста, одним запросом."""
+        return self.select_related('author', 'author__profile', 'group')
+
+
 class Post(models.Model):
     title = models.CharField(max_length=50, verbose_name='Заголовок')
     text = models.TextField(verbose_name='Текст',
@@ -36,9 +42,29 @@ class Post(models.Model):
                               verbose_name='Группа',
                               help_text='Выберите группу (не обязательно)')
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    likes_count = models.IntegerField(default=0, editable=False,
+                                      verbose_name='Лайков')
+    comments_count = models.IntegerField(default=0, editable=False,
+                                         verbose_name='Комментариев')
+    # растёт при правке, лайке, комментарии и готовности миниатюр:
+    # ключ кэша карточки поста
+    cache_version = models.IntegerField(default=0, editable=False)
+    # время последней правки поста или его счётчиков
+    updated = models.DateTimeField('date updated', auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_id_idx'),
+            # ленты автора и группы: фильтр и keyset-сортировка по индексу
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -59,6 +85,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('post', '-created'),
+                         name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -72,6 +102,9 @@ class Follow(models.Model):
                                related_name='following',
                                verbose_name='Подписчик')
 
+    class Meta:
+        unique_together = ('user', 'author')
+
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -87,4 +120,127 @@ class Likes(models.Model):
     post = models.ForeignKey(Post, blank=False, null=False,
                              on_delete=models.CASCADE,
                              related_name='likes')
- 
+
+    class Meta:
+        unique_together = ('user', 'post')
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    posts_count = models.IntegerField(default=0, verbose_name='Записей')
+    followers_count = models.IntegerField(default=0,
+                                          verbose_name='Подписчиков')
+    following_count = models.IntegerField(default=0, verbose_name='Подписок')
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='search_terms')
+    weight = models.FloatField(default=1)
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+    def __str__(self):
+        return self.term
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    # копия post.pub_date, чтобы обрезать ленту без join
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(fields=('user', '-pub_date'),
+                         name='timeline_user_pub_date_idx'),
+        )
+
+
+class RequestProfile(models.Model):
+    """Замер одного запроса, см. posts/profiling.py."""
+    url_name = models.CharField(max_length=100, verbose_name='Имя URL')
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=500, verbose_name='Адрес')
+    status = models.PositiveSmallIntegerField(verbose_name='Статус')
+    created = models.DateTimeField(auto_now_add=True, db_index=True,
+                                   verbose_name='Время')
+    wall_ms = models.FloatField(verbose_name='Ответ, мс')
+    sql_count = models.IntegerField(verbose_name='SQL-запросов')
+    sql_ms = models.FloatField(verbose_name='SQL, мс')
+    template_ms = models.FloatField(verbose_name='Шаблоны, мс')
+    # JSON: [[мс, sql], ...] от самого медленного
+    slow_queries = models.TextField(blank=True,
+                                    verbose_name='Медленные запросы')
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('url_name', 'created'),
+                         name='profile_url_name_created_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
+
+
+class Job(models.Model):
+    """Фоновая задача, см. posts/jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не удалась'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    # ключ идемпотентности: пока задача с тем же именем и ключом ждёт
+    # в очереди, такая же вторая не ставится
+    key = models.CharField(max_length=200, blank=True, verbose_name='Ключ')
+    # JSON с именованными аргументами задачи
+    payload = models.TextField(default='{}', verbose_name='Аргументы')
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED, verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5, verbose_name='Попыток не больше')
+    run_after = models.DateTimeField(verbose_name='Не раньше')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Поставлена')
+    started = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Начата')
+    finished = models.DateTimeField(null=True, blank=True, db_index=True,
+                                    verbose_name='Закончена')
+    duration_ms = models.FloatField(null=True, blank=True,
+                                    verbose_name='Выполнялась, мс')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('status', 'run_after'),
+                         name='job_status_run_after_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'key'),
+                condition=models.Q(status='queued') & ~models.Q(key=''),
+                name='job_queued_key_unique'),
+        )
+
+    def __str__(self):
+        return f'{self.name} {self.key}'.strip()
@@ -0,0 +1,106 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+PageCacheMiddleware отдаёт готовый HTML страниц из PAGE_CACHE_VIEWS на
+GET- и HEAD-запросы без cookie сессии: такие посетители видят одну и ту
+же страницу. Ключ — путь со строкой запроса, в значении — версия
+пространства имён ``pages`` на момент рендеринга; сигналы увеличивают её
+при изменении постов, комментариев, лайков, подписок, групп и профилей.
+
+Устаревшую страницу пересобирает один запрос — тот, кто первым взял
+блокировку; остальные до конца пересборки получают прежнюю версию, а
+если её нет, недолго ждут новую. Ответы, которые ставят cookie или
+использовали CSRF-токен, не кэшируются.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from yatube.routers import reading_from_replica
+
+from .cache import PAGES, version
+
+
+def page_key(request):
+    # схема и хост — часть ключа: в странице бывают абсолютные адреса
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'page:{url}'
+
+
+def cacheable_request(request):
+    return (request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and request.resolver_match.view_name in settings.PAGE_CACHE_VIEWS)
+
+
+def cacheable_response(request, response):
+    return (response.status_code == 200 and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def not_modified(request, response):
+    """304 по ETag и Last-Modified из кэша, как ответила бы сама view."""
+    last_modified = response.get('Last-Modified')
+    return get_conditional_response(
+        request, etag=response.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=response)
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.timeout = settings.CACHE_TIMEOUTS['page']
+        if not self.timeout:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.page_cache = None
+        response = self.get_response(request)
+        if request.page_cache is None:
+            return response
+        key, current = request.page_cache
+        response['X-Page-Cache'] = 'miss'
+        try:
+            if request.method == 'GET' and cacheable_response(request,
+                                                              response):
+                timeout = self.timeout
+                if reading_from_replica():
+                    # как в posts.cache: реплика могла не увидеть изменение
+                    timeout = min(timeout, settings.REPLICA_LAG_SECONDS)
+                cache.set(key, (current, response), timeout)
+        finally:
+            cache.delete(f'{key}:lock')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not cacheable_request(request):
+            return None
+        key = page_key(request)
+        current = version(PAGES)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == current:
+            return self.serve(request, entry[1], 'hit')
+        if cache.add(f'{key}:lock', 1, settings.PAGE_CACHE_LOCK_SECONDS):
+            request.page_cache = (key, current)
+            return None
+        if entry is not None:
+            return self.serve(request, entry[1], 'stale')
+        deadline = time.monotonic() + settings.PAGE_CACHE_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return self.serve(request, entry[1], 'hit')
+        # не дождались: рендерим сами, но кэш не трогаем
+        return None
+
+    def serve(self, request, response, state):
+        response = not_modified(request, response)
+        response['X-Page-Cache'] = state
+        return response
@@ -0,0 +1,142 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+
+class WindowedPage(Page):
+    window_radius = 3
+
+    @property
+    def page_window(self):
+        """Номера страниц вокруг текущей, а не весь page_range."""
+        first = max(self.number - self.window_radius, 1)
+        last = min(self.number + self.window_radius, self.paginator.num_pages)
+        return range(first, last + 1)
+
+
+class WindowedPaginator(Paginator):
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация: страница ищется по ключу сортировки, без OFFSET
+    и без COUNT(*). Последним полем ordering должен быть уникальный ключ.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [
+            object_list.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for field in self.fields]
+        token = base64.urlsafe_b64encode(json.dumps(values).encode())
+        return token.decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.fields):
+                return None
+            return [field.to_python(value)
+                    for field, value in zip(self.fields, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+
+    def _seek(self, values, backwards):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+        condition = Q()
+        equal = {}
+        for name, field, value in zip(self.ordering, self.fields, values):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{field.attname}__{lookup}': value})
+            equal[field.attname] = value
+        if len(self.fields) > 1:
+            # лишнее с точки зрения логики условие на первое поле даёт
+            # базе диапазон по индексу: по одному OR SQLite идёт перебором
+            descending = self.ordering[0].startswith('-')
+            lookup = 'lte' if descending != backwards else 'gte'
+            condition &= Q(**{f'{self.fields[0].attname}__{lookup}':
+                              values[0]})
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering]
+
+    def get_page(self, after=None, before=None):
+        """Невалидный курсор, как и в Paginator.get_page, даёт первую
+        страницу."""
+        after = self.decode_cursor(after) if after else None
+        before = self.decode_cursor(before) if before else None
+        if before is not None:
+            return self._page_before(before)
+        return self._page_after(after)
+
+    def _page_after(self, values):
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards=False))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = None
+        previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and values is not None:
+            previous_cursor = self.encode_cursor(rows[0])
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def _page_before(self, values):
+        queryset = self.object_list.order_by(*self._reversed_ordering())
+        queryset = queryset.filter(self._seek(values, backwards=True))
+        rows = list(queryset[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            return self._page_after(None)
+        previous_cursor = self.encode_cursor(rows[0]) if has_previous else None
+        return CursorPage(rows, self, self.encode_cursor(rows[-1]),
+                          previous_cursor)
@@ -0,0 +1,54 @@
+"""Независимые части страницы — параллельно.
+
+В Django 2.2 нет асинхронных view, поэтому то, что не зависит друг от
+друга (лента профиля, подписка зрителя, карточка автора), выполняется в
+пуле потоков, каждая часть со своим соединением с базой. Параллельность
+включается PARALLEL_QUERIES; без неё, а также внутри транзакции, чьих
+незавершённых данных другие соединения не видят (в том числе в тестах),
+части выполняются по очереди в текущем потоке.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from yatube.routers import reading_from_replica, replica_reads
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _call(func, replica):
+    with replica_reads(replica):
+        try:
+            return func()
+        finally:
+            # при CONN_MAX_AGE=0 каждая часть открывает своё соединение:
+            # для PostgreSQL нужен pgbouncer или постоянные соединения
+            close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # два запроса могут прийти сюда одновременно: пул создаёт один
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PARALLEL_QUERY_WORKERS,
+                    thread_name_prefix='queries')
+    return _executor
+
+
+def gather(*funcs):
+    """Результаты вызовов funcs в том же порядке."""
+    if (not settings.PARALLEL_QUERIES or len(funcs) < 2
+            or connection.in_atomic_block):
+        return [func() for func in funcs]
+    executor = _get_executor()
+    replica = reading_from_replica()
+    futures = [executor.submit(_call, func, replica) for func in funcs[1:]]
+    # первую часть — в своём потоке, чтобы не ждать свободный поток пула
+    return [funcs[0]()] + [future.result() for future in futures]
@@ -0,0 +1,173 @@
+"""Профилирование запросов.
+
+ProfilingMiddleware записывает для части запросов (PROFILING_SAMPLE_RATE,
+1 — для всех) время ответа, число и время SQL-запросов, время рендеринга
+шаблонов и самые медленные запросы в RequestProfile. При нулевой доле
+middleware отключается целиком и ничего не стоит. Сводка по именам URL —
+``manage.py profile_report``.
+"""
+import contextlib
+import heapq
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+from .models import RequestProfile
+
+
+# верхние границы корзин гистограммы времени ответа, мс
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_current = threading.local()
+_installed = False
+
+
+class Sample:
+    def __init__(self, slow_queries):
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.slow = []
+        self.slow_limit = slow_queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.sql_count += 1
+            self.sql_ms += elapsed
+            item = (round(elapsed, 3), sql)
+            if len(self.slow) < self.slow_limit:
+                heapq.heappush(self.slow, item)
+            else:
+                heapq.heappushpop(self.slow, item)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        sample = getattr(_current, 'sample', None)
+        if sample is None:
+            return render(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            sample.template_ms += (time.perf_counter() - start) * 1000
+    return wrapper
+
+
+def install_template_timer():
+    """Оборачивает рендеринг шаблонов бэкенда Django. Вложенные include
+    рендерятся внутри и отдельно не считаются; SQL ленивых queryset,
+    выполненный из шаблона, входит и во время шаблонов."""
+    global _installed
+    if not _installed:
+        Template.render = _timed_render(Template.render)
+        _installed = True
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.rate = settings.PROFILING_SAMPLE_RATE
+        if not self.rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_queries = settings.PROFILING_SLOW_QUERIES
+        install_template_timer()
+
+    def __call__(self, request):
+        if self.rate < 1 and random.random() >= self.rate:
+            return self.get_response(request)
+        sample = Sample(self.slow_queries)
+        _current.sample = sample
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            _current.sample = None
+        wall_ms = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        RequestProfile.objects.create(
+            url_name=(match.url_name if match else None) or '-',
+            method=request.method,
+            path=request.path[:500],
+            status=response.status_code,
+            wall_ms=round(wall_ms, 3),
+            sql_count=sample.sql_count,
+            sql_ms=round(sample.sql_ms, 3),
+            template_ms=round(sample.template_ms, 3),
+            slow_queries=json.dumps(sorted(sample.slow, reverse=True),
+                                    ensure_ascii=False),
+        )
+        return response
+
+
+def percentile(values, fraction):
+    """values отсортированы по возрастанию."""
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def histogram(values):
+    counts = [0] * (len(BUCKETS) + 1)
+    for value in values:
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def summarize(samples):
+    """Сводка по именам URL для queryset RequestProfile."""
+    rows = {}
+    for url_name, wall_ms, sql_count, sql_ms, template_ms in (
+            samples.values_list('url_name', 'wall_ms', 'sql_count',
+                                'sql_ms', 'template_ms').iterator()):
+        row = rows.setdefault(url_name, {'wall': [], 'sql_count': 0,
+                                         'sql_ms': 0.0, 'template_ms': 0.0})
+        row['wall'].append(wall_ms)
+        row['sql_count'] += sql_count
+        row['sql_ms'] += sql_ms
+        row['template_ms'] += template_ms
+    summary = []
+    for url_name, row in rows.items():
+        wall = sorted(row['wall'])
+        count = len(wall)
+        summary.append({
+            'url_name': url_name,
+            'requests': count,
+            'p50_ms': round(percentile(wall, 0.5), 1),
+            'p95_ms': round(percentile(wall, 0.95), 1),
+            'p99_ms': round(percentile(wall, 0.99), 1),
+            'max_ms': round(wall[-1], 1),
+            'sql_count': round(row['sql_count'] / count, 1),
+            'sql_ms': round(row['sql_ms'] / count, 1),
+            'template_ms': round(row['template_ms'] / count, 1),
+            'histogram': histogram(wall),
+        })
+    summary.sort(key=lambda row: row['p95_ms'] * row['requests'],
+                 reverse=True)
+    return summary
+
+
+def slowest_queries(samples, limit):
+    """Самые медленные запросы из выборки: (мс, имя URL, SQL)."""
+    found = []
+    for url_name, slow in samples.values_list('url_name',
+                                              'slow_queries').iterator():
+        for elapsed, sql in json.loads(slow or '[]'):
+            found.append((elapsed, url_name, sql))
+    return heapq.nlargest(limit, found)
@@ -0,0 +1,49 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND: 'fts5' — виртуальная таблица
+SQLite FTS5, 'table' — инвертированный индекс в обычной таблице, 'auto' —
+FTS5, если она есть в базе, иначе таблица.
+"""
+from django.conf import settings
+
+from .backends import SQLiteFTSBackend, TableBackend
+
+
+BACKENDS = {
+    'fts5': SQLiteFTSBackend,
+    'table': TableBackend,
+}
+
+
+def get_backend():
+    name = settings.SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if SQLiteFTSBackend.available() else 'table'
+    return BACKENDS[name]()
+
+
+def search_posts(query, limit=None):
+    if limit is None:
+        limit = settings.SEARCH_MAX_RESULTS
+    return get_backend().search(query, limit)
+
+
+def index_posts(posts):
+    get_backend().index(posts)
+
+
+def reindex_posts(posts, batch_size=500):
+    """Переиндексирует queryset постов пачками по pk."""
+    posts = posts.select_related('author', 'group').order_by('pk')
+    backend = get_backend()
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        backend.index(batch)
+        last_pk = batch[-1].pk
+
+
+def remove_posts(post_ids):
+    get_backend().remove(post_ids)
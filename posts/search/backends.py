@@ -0,0 +1,138 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+
+from ..models import SearchTerm
+from .tokenizer import tokenize, words
+
+
+FIELD_WEIGHTS = {'title': 3.0, 'text': 1.0, 'author': 2.0, 'group': 2.0}
+
+
+def document(post):
+    """Поля поста, разбитые на основы слов."""
+    username = words(post.author.username)
+    return {
+        'title': tokenize(post.title),
+        'text': tokenize(post.text),
+        # имя пользователя ищется и как есть, и по основе
+        'author': username + [word for word in tokenize(post.author.username)
+                              if word not in username],
+        'group': tokenize(post.group.title) if post.group_id else [],
+    }
+
+
+class SearchBackend:
+    def index(self, posts):
+        raise NotImplementedError
+
+    def remove(self, post_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        """id постов, подходящих под все слова запроса, по релевантности.
+
+        Последнее слово ищется по префиксу, чтобы находить недописанное.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    table = 'posts_search_fts'
+    _available = {}
+
+    @classmethod
+    def available(cls):
+        if connection.vendor != 'sqlite':
+            return False
+        name = connection.settings_dict['NAME']
+        if name not in cls._available:
+            cls._available[name] = (
+                cls.table in connection.introspection.table_names())
+        return cls._available[name]
+
+    def index(self, posts):
+        rows = []
+        for post in posts:
+            fields = document(post)
+            rows.append([post.pk] + [' '.join(fields[name])
+                                     for name in FIELD_WEIGHTS])
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s',
+                               [row[:1] for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, text, author, grp) '
+                f'VALUES (%s, %s, %s, %s, %s)', rows)
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s',
+                               [[pk] for pk in post_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, limit):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        phrases = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+        phrases[-1] += '*'
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                [' AND '.join(phrases), limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TableBackend(SearchBackend):
+    """Инвертированный индекс в таблице SearchTerm: работает на любой БД."""
+
+    term_length = SearchTerm._meta.get_field('term').max_length
+
+    def index(self, posts):
+        entries = []
+        post_ids = []
+        for post in posts:
+            post_ids.append(post.pk)
+            weights = Counter()
+            for name, tokens in document(post).items():
+                for token in tokens:
+                    weights[token[:self.term_length]] += FIELD_WEIGHTS[name]
+            entries += [SearchTerm(post_id=post.pk, term=term, weight=weight)
+                        for term, weight in weights.items()]
+        with transaction.atomic():
+            SearchTerm.objects.filter(post_id__in=post_ids).delete()
+            SearchTerm.objects.bulk_create(entries)
+
+    def remove(self, post_ids):
+        SearchTerm.objects.filter(post_id__in=post_ids).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, query, limit):
+        terms = [term[:self.term_length] for term in tokenize(query)]
+        if not terms:
+            return []
+        *exact, prefix = terms
+        # префикс — диапазоном, чтобы работал обычный индекс по term
+        conditions = [Q(term=term) for term in exact]
+        conditions.append(Q(term__gte=prefix, term__lt=prefix + '\uffff'))
+        rows = SearchTerm.objects.all()
+        matching = Q()
+        for condition in conditions:
+            rows = rows.filter(
+                post__in=SearchTerm.objects.filter(condition).values('post'))
+            matching |= condition
+        rows = rows.filter(matching).values('post').annotate(
+            score=Sum('weight')).order_by('-score', '-post')
+        return list(rows.values_list('post', flat=True)[:limit])
@@ -0,0 +1,135 @@
+"""Стеммер Портера (Snowball) для русского языка."""
+import re
+
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    (('в', 'вши', 'вшись'), True),
+    (('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), False),
+)
+ADJECTIVE = (
+    (('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+      'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+      'ая', 'яя', 'ою', 'ею'), False),
+)
+PARTICIPLE = (
+    (('ем', 'нн', 'вш', 'ющ', 'щ'), True),
+    (('ивш', 'ывш', 'ующ'), False),
+)
+REFLEXIVE = (
+    (('ся', 'сь'), False),
+)
+VERB = (
+    (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+      'ют', 'ны', 'ть', 'ешь', 'нно'), True),
+    (('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+      'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+      'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'), False),
+)
+NOUN = (
+    (('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+      'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+      'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+      'ья', 'я'), False),
+)
+SUPERLATIVE = (
+    (('ейше', 'ейш'), False),
+)
+DERIVATIONAL = ('ость', 'ост')
+
+CYRILLIC = re.compile('[а-я]')
+
+
+def _remove_ending(word, groups):
+    """Срезает самое длинное окончание из groups или возвращает None.
+
+    Окончания с флагом True допустимы только после «а» или «я».
+    """
+    found = None
+    for endings, after_a in groups:
+        for ending in endings:
+            if word.endswith(ending) and (
+                    found is None or len(ending) > len(found[0])):
+                found = (ending, after_a)
+    if found is None:
+        return None
+    ending, after_a = found
+    stem = word[:-len(ending)]
+    if after_a and not stem.endswith(('а', 'я')):
+        return None
+    return stem
+
+
+def _region(word, start=0):
+    """Начало области после первой согласной, идущей за гласной."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, groups):
+    """Как _remove_ending, но без подходящего окончания — слово как есть."""
+    stripped = _remove_ending(word, groups)
+    return word if stripped is None else stripped
+
+
+def _adjectival(rv):
+    """Прилагательное, возможно, с суффиксом причастия перед ним."""
+    stripped = _remove_ending(rv, ADJECTIVE)
+    if stripped is None:
+        return None
+    return _strip(stripped, PARTICIPLE)
+
+
+def _inflection(rv):
+    """Шаг 1: деепричастие, иначе возвратная частица и окончание
+    прилагательного, глагола или существительного."""
+    stripped = _remove_ending(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    rv = _strip(rv, REFLEXIVE)
+    stripped = _adjectival(rv)
+    if stripped is None:
+        stripped = _remove_ending(rv, VERB)
+    if stripped is None:
+        stripped = _remove_ending(rv, NOUN)
+    return rv if stripped is None else stripped
+
+
+def _derivational(rv, offset, r2):
+    """Шаг 3: словообразовательный суффикс, если он целиком в R2."""
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and offset + len(rv) - len(ending) >= r2:
+            return rv[:-len(ending)]
+    return rv
+
+
+def _superlative(rv):
+    """Шаг 4: превосходная степень, удвоенная «н» или мягкий знак."""
+    superlative = _remove_ending(rv, SUPERLATIVE)
+    if superlative is not None:
+        rv = superlative
+    if rv.endswith('нн'):
+        return rv[:-1]
+    if superlative is None and rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word
+    match = re.search(f'[{VOWELS}]', word)
+    if match is None:
+        return word
+    prefix, rv = word[:match.end()], word[match.end():]
+    r2 = _region(word, _region(word))
+
+    rv = _inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    rv = _derivational(rv, len(prefix), r2)
+    return prefix + _superlative(rv)
@@ -0,0 +1,25 @@
+import re
+
+from .stemmer import stem
+
+
+WORD = re.compile(r'\w+')
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'еще', 'нет', 'о', 'из', 'ему', 'ли', 'если', 'или', 'ни',
+    'быть', 'был', 'до', 'вас', 'уже', 'для', 'это', 'the', 'a', 'an',
+    'and', 'or', 'of', 'to', 'in', 'is',
+))
+
+
+def words(text):
+    """Слова текста в нижнем регистре, «ё» заменена на «е»."""
+    return WORD.findall((text or '').lower().replace('ё', 'е'))
+
+
+def tokenize(text):
+    """Основы слов текста без стоп-слов, в порядке появления."""
+    return [stem(word) for word in words(text) if word not in STOP_WORDS]
@@ -0,0 +1,183 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import (FEEDS, GROUPS, PAGES, invalidate_on_commit,
+                    profile_namespace)
+from .counters import post_counters_changed, user_stats_changed
+from .jobs import enqueue
+from .models import (Comment, Follow, Group, Likes, Post, Profile, User,
+                     UserStats)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_on_commit(profile_namespace(
+        instance.pk if sender is User else instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def feeds_changed(sender, **kwargs):
+    invalidate_on_commit(FEEDS)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+# в списках групп число постов и последняя активность: новый, удалённый
+# или перенесённый в другую группу пост их меняет
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def groups_changed(sender, **kwargs):
+    invalidate_on_commit(GROUPS)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Likes)
+@receiver(post_delete, sender=Likes)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=User)
+def pages_changed(sender, update_fields=None, **kwargs):
+    # вход пользователя сохраняет только last_login: страницы те же
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_on_commit(PAGES)
+
+
+@receiver(pre_save, sender=Post)
+def post_edited(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance.cache_version = F('cache_version') + 1
+
+
+@receiver(post_save, sender=Post)
+def post_version_loaded(sender, instance, raw=False, **kwargs):
+    # после save() в объекте осталось выражение F(), а не номер версии
+    if hasattr(instance.cache_version, 'resolve_expression'):
+        instance.refresh_from_db(fields=['cache_version'])
+
+
+# имя автора и название группы попадают в поисковый индекс их постов
+SEARCH_NAMES = {User: 'username', Group: 'title'}
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Group)
+def search_name_edited(sender, instance, raw=False, update_fields=None,
+                       **kwargs):
+    field = SEARCH_NAMES[sender]
+    if instance.pk is None or raw or (
+            update_fields is not None and field not in update_fields):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list(
+        field, flat=True).first()
+    instance._search_name_changed = (
+        old is not None and old != getattr(instance, field))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+def search_name_saved(sender, instance, **kwargs):
+    if not getattr(instance, '_search_name_changed', False):
+        return
+    instance._search_name_changed = False
+    if sender is User:
+        enqueue('search.reindex_author', key=instance.pk,
+                user_id=instance.pk)
+    else:
+        enqueue('search.reindex_group', key=instance.pk,
+                group_id=instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        user_stats_changed(instance.author_id, posts_count=1)
+
+
+@receiver(post_save, sender=Post)
+def post_created_to_timelines(sender, instance, created, raw=False,
+                              **kwargs):
+    if created and not raw:
+        enqueue('timeline.fan_out', key=instance.pk, post_id=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    user_stats_changed(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def post_saved_to_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        enqueue('search.index', key=instance.pk, post_id=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_from_search(sender, instance, **kwargs):
+    enqueue('search.remove', key=instance.pk, post_id=instance.pk)
+
+
+@receiver(post_save, sender=Likes)
+def like_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        post_counters_changed(instance.post_id, likes_count=1)
+
+
+@receiver(post_delete, sender=Likes)
+def like_deleted(sender, instance, **kwargs):
+    post_counters_changed(instance.post_id, likes_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        post_counters_changed(instance.post_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    post_counters_changed(instance.post_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        user_stats_changed(instance.user_id, following_count=1)
+        user_stats_changed(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    user_stats_changed(instance.user_id, following_count=-1)
+    user_stats_changed(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created_to_timeline(sender, instance, created, raw=False,
+                               **kwargs):
+    if created and not raw:
+        enqueue('timeline.follow',
+                key=f'{instance.user_id}:{instance.author_id}',
+                user_id=instance.user_id, author_id=instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted_from_timeline(sender, instance, **kwargs):
+    enqueue('timeline.follow',
+            key=f'{instance.user_id}:{instance.author_id}',
+            user_id=instance.user_id, author_id=instance.author_id)
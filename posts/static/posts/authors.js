@@ -0,0 +1,32 @@
+// Подсказки в поиске авторов: по мере ввода список имён приходит из
+// data-lookup-url. Без JavaScript форма просто фильтрует каталог по ?q=.
+(function () {
+    var timer;
+    document.addEventListener('input', function (event) {
+        var input = event.target;
+        if (!input.dataset || !input.dataset.lookupUrl || !window.fetch) return;
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            var query = input.value.trim();
+            var list = document.getElementById(input.getAttribute('list'));
+            if (!query) {
+                list.innerHTML = '';
+                return;
+            }
+            fetch(input.dataset.lookupUrl + '?q=' + encodeURIComponent(query), {
+                credentials: 'same-origin',
+            }).then(function (response) {
+                if (!response.ok) throw new Error(response.status);
+                return response.json();
+            }).then(function (data) {
+                list.innerHTML = '';
+                data.authors.forEach(function (author) {
+                    var option = document.createElement('option');
+                    option.value = author.username;
+                    option.label = author.full_name;
+                    list.appendChild(option);
+                });
+            }).catch(function () {});
+        }, 150);
+    });
+})();
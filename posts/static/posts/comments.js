@@ -0,0 +1,20 @@
+// «Показать ещё» под комментариями: следующая порция приходит готовым
+// HTML и встаёт на место кнопки. Без JavaScript кнопка — обычная ссылка
+// на страницу поста с ?comments_after=.
+(function () {
+    document.addEventListener('click', function (event) {
+        var link = event.target.closest('a[data-more-url]');
+        if (!link || !window.fetch) return;
+        event.preventDefault();
+        var url = link.dataset.moreUrl;
+        link.removeAttribute('data-more-url');
+        fetch(url, {credentials: 'same-origin'}).then(function (response) {
+            if (!response.ok) throw new Error(response.status);
+            return response.text();
+        }).then(function (html) {
+            link.parentNode.outerHTML = html;
+        }).catch(function () {
+            window.location = link.href;
+        });
+    });
+})();
@@ -0,0 +1,28 @@
+// Лайк без перезагрузки страницы: POST на data-toggle-url, в ответе
+// {liked, likes_count}. Без входа (403) и при ошибке — обычный переход
+// по ссылке, который сам перенаправит на вход или вернёт на страницу.
+(function () {
+    var token = document.querySelector('meta[name="csrf-token"]');
+    document.addEventListener('click', function (event) {
+        var link = event.target.closest('a[data-toggle-url]');
+        if (!link || !token || !window.fetch) return;
+        event.preventDefault();
+        if (link.dataset.pending) return;
+        link.dataset.pending = '1';
+        fetch(link.dataset.toggleUrl, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'X-CSRFToken': token.content},
+        }).then(function (response) {
+            if (!response.ok) throw new Error(response.status);
+            return response.json();
+        }).then(function (data) {
+            link.textContent = data.likes_count;
+            link.style.color = data.liked ? '#e0245e' : '';
+        }).catch(function () {
+            window.location = link.href;
+        }).finally(function () {
+            delete link.dataset.pending;
+        });
+    });
+})();
@@ -0,0 +1,66 @@
+"""Фоновые задачи, которые ставят сигналы, см. posts/jobs.py.
+
+Аргументы — только id: к выполнению объект мог измениться или исчезнуть,
+поэтому задача перечитывает его сама.
+"""
+from . import thumbnails
+from .counters import recount_posts, recount_user_stats
+from .jobs import task
+from .models import Follow, Post, User
+from .search import index_posts, reindex_posts, remove_posts
+from .timeline import backfill, drop_author, fan_out_post
+
+
+@task('counters.post')
+def recount_post(post_id):
+    recount_posts(Post.objects.filter(pk=post_id))
+
+
+@task('counters.user')
+def recount_user(user_id):
+    recount_user_stats(User.objects.filter(pk=user_id))
+
+
+@task('search.index')
+def index_post(post_id):
+    index_posts(Post.objects.filter(pk=post_id).select_related(
+        'author', 'group'))
+
+
+@task('search.reindex_author')
+def reindex_author(user_id):
+    reindex_posts(Post.objects.filter(author_id=user_id))
+
+
+@task('search.reindex_group')
+def reindex_group(group_id):
+    reindex_posts(Post.objects.filter(group_id=group_id))
+
+
+@task('search.remove')
+def remove_post(post_id):
+    remove_posts([post_id])
+
+
+@task('timeline.fan_out')
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author', 'pub_date').first()
+    if post is not None:
+        fan_out_post(post)
+
+
+@task('timeline.follow')
+def sync_timeline(user_id, author_id):
+    # подписку и отписку подряд выполняет одна задача: смотрим, что
+    # осталось к её выполнению
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+    else:
+        drop_author(user_id, author_id)
+
+
+@task('thumbnails.render', max_attempts=3)
+def render_thumbnails(name):
+    thumbnails.render_all(name)
+    thumbnails.mark_ready(name)
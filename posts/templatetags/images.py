@@ -0,0 +1,40 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from ..thumbnails import PLACEHOLDER, thumbnail_url, variants
+
+
+register = template.Library()
+
+
+def _name(image):
+    return getattr(image, 'name', image)
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for width, url in urls)
+
+
+@register.simple_tag
+def thumbnail(image, spec):
+    """{% thumbnail post.image 'cover' %} — адрес готовой миниатюры или
+    заглушки. image — поле с файлом или имя файла в хранилище."""
+    return thumbnail_url(_name(image), spec)
+
+
+@register.simple_tag
+def picture(image, spec, sizes='100vw', css_class='', style=''):
+    """<picture> с WebP и JPEG всех ширин миниатюры:
+    {% picture post.image 'cover' sizes='(max-width: 960px) 100vw, 960px' %}
+    """
+    urls = variants(_name(image), spec)
+    if urls is None:
+        return format_html('<img class="{}" style="{}" src="{}" />',
+                           css_class, style, static(PLACEHOLDER))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}" />'
+        '<img class="{}" style="{}" src="{}" srcset="{}" sizes="{}" '
+        'loading="lazy" /></picture>',
+        _srcset(urls['webp']), sizes, css_class, style,
+        urls['jpg'][-1][1], _srcset(urls['jpg']), sizes)
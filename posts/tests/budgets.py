@@ -0,0 +1,99 @@
+"""Бюджеты SQL-запросов для страниц.
+
+В query_budgets.json для имени URL записаны предельные число запросов,
+число повторов одного и того же запроса (признак N+1) и суммарное время
+SQL в миллисекундах. Проверять бюджет можно в тесте через
+QueryBudgetMixin.assertWithinBudget или для всего прогона pytest плагином
+posts.tests.query_budget_plugin.
+"""
+import contextlib
+import json
+import os
+import time
+from collections import Counter
+
+from django.db import connection
+
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_budgets(budgets, path=BUDGETS_PATH):
+    with open(path, 'w') as file:
+        json.dump(budgets, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+class Recording:
+    """Запросы одного HTTP-запроса к странице."""
+
+    def __init__(self, url_name):
+        self.url_name = url_name
+        self.statements = []
+        self.sql_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - start) * 1000
+            self.statements.append((sql, repr(params)))
+
+    @property
+    def queries(self):
+        return len(self.statements)
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in Counter(self.statements).values())
+
+    def stats(self):
+        return {'queries': self.queries, 'duplicates': self.duplicates,
+                'sql_ms': round(self.sql_ms, 2)}
+
+    def most_repeated(self):
+        (sql, _), count = Counter(self.statements).most_common(1)[0]
+        return f'{count}× {sql}'
+
+    def violations(self, budget):
+        """Сообщения о превышении бюджета, пустой список — всё в порядке."""
+        messages = []
+        for key, value in self.stats().items():
+            limit = budget.get(key)
+            if limit is not None and value > limit:
+                messages.append(f'{self.url_name}: {key} = {value}, '
+                                f'бюджет {limit}')
+        if messages and self.duplicates:
+            messages.append(f'чаще всего повторяется: {self.most_repeated()}')
+        return messages
+
+
+@contextlib.contextmanager
+def record_queries(url_name):
+    recording = Recording(url_name)
+    with connection.execute_wrapper(recording):
+        yield recording
+
+
+class QueryBudgetMixin:
+    """Для TestCase:
+
+        with self.assertWithinBudget('index'):
+            self.client.get(reverse('index'))
+    """
+    budgets_path = BUDGETS_PATH
+
+    @contextlib.contextmanager
+    def assertWithinBudget(self, url_name):
+        budget = load_budgets(self.budgets_path)[url_name]
+        with record_queries(url_name) as recording:
+            yield recording
+        violations = recording.violations(budget)
+        if violations:
+            self.fail('\n'.join(violations))
@@ -0,0 +1,117 @@
+"""Плагин pytest: проверяет бюджеты запросов для каждой GET-страницы,
+открытой тестовым клиентом в любом тесте.
+
+Подключён в conftest.py в корне проекта. Тест, в котором страница вышла
+за бюджет из query_budgets.json, падает с описанием превышения.
+``--update-query-budgets`` вместо проверки записывает в файл наблюдённые
+максимумы, ``--no-query-budgets`` отключает плагин.
+"""
+import threading
+
+import pytest
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('query budgets')
+    group.addoption('--no-query-budgets', action='store_true',
+                    help='Не проверять бюджеты SQL-запросов страниц')
+    group.addoption('--update-query-budgets', action='store_true',
+                    help='Записать наблюдённые значения в query_budgets.json')
+
+
+def pytest_configure(config):
+    if not config.getoption('no_query_budgets'):
+        config.pluginmanager.register(
+            BudgetGuard(config.getoption('update_query_budgets')),
+            'query_budget_guard')
+
+
+class BudgetGuard:
+    def __init__(self, update):
+        self.update = update
+        self.budgets = None
+        self.observed = {}
+        self.violations = {}
+        self.current = threading.local()
+        self.nodeid = None
+
+    def connect(self):
+        from django.core.signals import request_finished, request_started
+
+        from .budgets import load_budgets
+
+        self.budgets = load_budgets()
+        request_started.connect(self.started, weak=False)
+        request_finished.connect(self.finished, weak=False)
+
+    def started(self, sender, environ=None, **kwargs):
+        from django.db import connection
+        from django.urls import Resolver404, resolve
+
+        from .budgets import Recording
+
+        self.current.recording = None
+        if environ is None or environ.get('REQUEST_METHOD') != 'GET':
+            return
+        try:
+            url_name = resolve(environ['PATH_INFO']).url_name
+        except Resolver404:
+            return
+        if url_name is None:
+            return
+        self.current.recording = Recording(url_name)
+        connection.execute_wrappers.append(self.current.recording)
+
+    def finished(self, sender, **kwargs):
+        from django.db import connection
+
+        recording = getattr(self.current, 'recording', None)
+        if recording is None:
+            return
+        self.current.recording = None
+        connection.execute_wrappers.remove(recording)
+        name = recording.url_name
+        stats = recording.stats()
+        observed = self.observed.setdefault(name, dict.fromkeys(stats, 0))
+        for key, value in stats.items():
+            observed[key] = max(observed[key], value)
+        if not self.update and name in self.budgets:
+            messages = recording.violations(self.budgets[name])
+            if messages and self.nodeid:
+                self.violations.setdefault(self.nodeid, []).extend(messages)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_setup(self, item):
+        if self.budgets is None:
+            self.connect()
+        self.nodeid = item.nodeid
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        report = outcome.get_result()
+        if call.when != 'call':
+            return
+        messages = self.violations.pop(item.nodeid, None)
+        if messages and report.passed:
+            report.outcome = 'failed'
+            report.longrepr = 'Превышен бюджет SQL-запросов:\n' + '\n'.join(
+                messages)
+
+    def pytest_sessionfinish(self, session):
+        if not self.update or not self.observed:
+            return
+        from .budgets import save_budgets
+
+        budgets = dict(self.budgets or {})
+        for name, observed in self.observed.items():
+            # время SQL зависит от машины: в бюджет идёт с запасом
+            budgets[name] = dict(observed,
+                                 sql_ms=max(50, round(observed['sql_ms'] * 5)))
+        save_budgets(budgets)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.update and self.observed:
+            terminalreporter.write_line(
+                'Бюджеты SQL-запросов обновлены: '
+                + ', '.join(sorted(self.observed)))
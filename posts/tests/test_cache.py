@@ -0,0 +1,172 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.shortcuts import reverse
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from .. import cache as posts_cache
+from ..management.commands.warm_cache import default_host
+from ..models import Follow, Group, Post, Profile
+
+
+class NamespaceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_changes_version(self):
+        before = posts_cache.version(posts_cache.FEEDS)
+        posts_cache.invalidate(posts_cache.FEEDS)
+        self.assertEqual(posts_cache.version(posts_cache.FEEDS), before + 1)
+
+    def test_cached_value_is_built_once_per_version(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {'ids': [1], 'next': None, 'previous': None}
+
+        posts_cache.feed_page('index', 'None:None', build)
+        posts_cache.feed_page('index', 'None:None', build)
+        self.assertEqual(len(calls), 1)
+        posts_cache.invalidate(posts_cache.FEEDS)
+        posts_cache.feed_page('index', 'None:None', build)
+        self.assertEqual(len(calls), 2)
+
+
+class InvalidateOnCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_changes_after_commit(self):
+        author = get_user_model().objects.create_user('viki')
+        before = posts_cache.versions([
+            posts_cache.FEEDS, posts_cache.PAGES,
+            posts_cache.profile_namespace(author.pk)])
+        with transaction.atomic():
+            Post.objects.create(author=author, title='пост', text='текст')
+            self.assertEqual(posts_cache.versions([
+                posts_cache.FEEDS, posts_cache.PAGES,
+                posts_cache.profile_namespace(author.pk)]), before)
+        after = posts_cache.versions([
+            posts_cache.FEEDS, posts_cache.PAGES,
+            posts_cache.profile_namespace(author.pk)])
+        self.assertTrue(all(new > old for old, new in zip(before, after)))
+
+    def test_rolled_back_change_keeps_version(self):
+        before = posts_cache.version(posts_cache.GROUPS)
+        with self.assertRaises(ValueError), transaction.atomic():
+            Group.objects.create(title='Кошки', slug='cats')
+            raise ValueError
+        self.assertEqual(posts_cache.version(posts_cache.GROUPS), before)
+
+
+class ViewCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user(
+            'viki', first_name='Вика')
+        self.client = Client()
+        self.group = Group.objects.create(title='Кошки', slug='cats')
+        for i in range(12):
+            Post.objects.create(author=self.author, title=f'пост {i}',
+                                text='текст', group=self.group)
+
+    def seek_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query for query in queries.captured_queries
+                if 'LIMIT 11' in query['sql']]
+
+    def test_feed_page_served_from_cache(self):
+        self.assertTrue(self.seek_queries(reverse('index')))
+        self.assertFalse(self.seek_queries(reverse('index')))
+
+    def test_new_post_invalidates_feeds(self):
+        self.client.get(reverse('index'))
+        Post.objects.create(author=self.author, title='свежий', text='т')
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0].title, 'свежий')
+
+    def test_profile_card_follows_stats_and_profile(self):
+        url = reverse('profile', args=['viki'])
+        self.assertEqual(self.client.get(url).context['card']['posts_count'],
+                         12)
+        reader = get_user_model().objects.create_user('reader')
+        Follow.objects.create(user=reader, author=self.author)
+        Profile.objects.create(user=self.author, bio='о себе')
+        card = self.client.get(url).context['card']
+        self.assertEqual(card['followers_count'], 1)
+        self.assertEqual(card['bio'], 'о себе')
+        self.assertEqual(card['full_name'], 'Вика')
+
+    def test_group_listing_invalidated_on_group_save(self):
+        self.client.get(reverse('all_groups'))
+        Group.objects.create(title='Собаки', slug='dogs')
+        response = self.client.get(reverse('all_groups'))
+        self.assertEqual(response.context['paginator'].count, 2)
+        self.assertContains(response, 'Собаки')
+
+    def test_group_listing_keyed_on_normalized_page(self):
+        self.client.get(reverse('all_groups'))
+        for page in ('abc', '999', '-1'):
+            with self.subTest(page=page), \
+                    CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('all_groups'),
+                                           {'page': page})
+                self.assertEqual(response.context['page'].number, 1)
+                self.assertFalse(any('posts_group' in query['sql']
+                                     for query in queries.captured_queries))
+
+    def test_group_listing_shows_activity(self):
+        Group.objects.create(title='Собаки', slug='dogs')
+        response = self.client.get(reverse('all_groups'))
+        stats = {group.slug: group.posts_count
+                 for group in response.context['groups']}
+        self.assertEqual(stats, {'cats': 12, 'dogs': 0})
+        self.assertContains(response, 'Записей: 12')
+        self.assertContains(response, 'Записей пока нет')
+
+    def test_moved_post_invalidates_group_listing(self):
+        dogs = Group.objects.create(title='Собаки', slug='dogs',
+                                    creator=self.author)
+        self.client.get(reverse('author_groups', args=['viki']))
+        post = Post.objects.filter(group=self.group).first()
+        post.group = dogs
+        post.save()
+        response = self.client.get(reverse('author_groups', args=['viki']))
+        self.assertEqual(response.context['groups'][0].posts_count, 1)
+        self.assertEqual(response.context['groups'][0].last_post,
+                         post.pub_date)
+
+
+class WarmCacheTest(TestCase):
+    def test_warms_index_and_groups(self):
+        author = get_user_model().objects.create_user('viki')
+        group = Group.objects.create(title='Кошки', slug='cats')
+        for i in range(25):
+            Post.objects.create(author=author, title=f'пост {i}', text='т',
+                                group=group)
+        cache.clear()
+        out = StringIO()
+        call_command('warm_cache', pages=2, groups=1, host='localhost',
+                     stdout=out)
+        # две страницы главной, две группы и список групп
+        self.assertIn('Прогрето страниц: 5', out.getvalue())
+        with CaptureQueriesContext(connection) as queries:
+            response = Client(HTTP_HOST='localhost').get(reverse('index'),
+                                                         secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('LIMIT 11' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_default_host_is_public(self):
+        with override_settings(ALLOWED_HOSTS=['localhost', 'testserver',
+                                              'yatube.example.com']):
+            self.assertEqual(default_host(), 'yatube.example.com')
+        with override_settings(ALLOWED_HOSTS=['localhost', '.example.com']):
+            self.assertEqual(default_host(), 'localhost')
@@ -0,0 +1,110 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from ..models import Comment, Follow, Group, Post, Profile
+from ..views import toggle_like
+
+
+class ConditionalGetTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user('viki')
+        self.reader = get_user_model().objects.create_user('reader')
+        Profile.objects.create(user=self.author)
+        self.group = Group.objects.create(title='Кошки', slug='cats')
+        self.posts = [Post.objects.create(author=self.author,
+                                          title=f'пост {i}', text='текст',
+                                          group=self.group)
+                      for i in range(3)]
+        self.client = Client()
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_modified(self):
+        post = self.posts[0]
+        for url in (reverse('index'), reverse('group_posts', args=['cats']),
+                    reverse('profile', args=['viki']),
+                    reverse('post', args=['viki', post.pk])):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_not_modified_skips_page_queries(self):
+        # анонимам страницу отдаёт кэш страниц, проверяем саму view
+        self.client.force_login(self.reader)
+        url = reverse('index')
+        # первый ответ ставит cookie CSRF, от неё зависит ETag
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # кроме сессии — только посты страницы по id из кэша ленты
+        posts = [query['sql'] for query in queries.captured_queries
+                 if 'posts_' in query['sql']]
+        self.assertEqual(len(posts), 1)
+        self.assertNotIn('JOIN', posts[0])
+
+    def test_deleted_post_is_modified(self):
+        url = reverse('index')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        since = http_date(time.time() + 60)
+        Post.objects.get(pk=self.posts[-1].pk).delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'пост 2')
+
+    def test_changes_are_modified(self):
+        post = self.posts[-1]
+        index = reverse('index')
+        group = reverse('group_posts', args=['cats'])
+        profile = reverse('profile', args=['viki'])
+        page = reverse('post', args=['viki', post.pk])
+        changes = {
+            'like': (lambda: toggle_like(self.reader, post.pk),
+                     (index, group, profile, page)),
+            'comment': (lambda: Comment.objects.create(
+                post=post, author=self.reader, text='к'),
+                (index, group, profile, page)),
+            'edit': (lambda: Post.objects.get(pk=post.pk).save(),
+                     (index, group, profile, page)),
+            'new post': (lambda: Post.objects.create(
+                author=self.author, title='новый', text='т',
+                group=self.group), (index, group, profile)),
+            'group': (lambda: Group.objects.get(pk=self.group.pk).save(),
+                      (group,)),
+            'follow': (lambda: Follow.objects.create(user=self.reader,
+                                                     author=self.author),
+                       (profile, page)),
+        }
+        for name, (change, urls) in changes.items():
+            etags = {url: self.client.get(url)['ETag'] for url in urls}
+            change()
+            for url, etag in etags.items():
+                with self.subTest(change=name, url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_viewer_changes_etag(self):
+        url = reverse('index')
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_missing_pages_still_404(self):
+        self.assertEqual(self.client.get(
+            reverse('group_posts', args=['dogs'])).status_code, 404)
+        self.assertEqual(self.client.get(
+            reverse('post', args=['viki', 999])).status_code, 404)
@@ -2,25 +2,33 @@ import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post, Comment, User
 
 
+# миниатюры синхронно: пул не должен писать во временный MEDIA_ROOT
+# после его удаления
+@override_settings(THUMBNAIL_ASYNC=False)
 class ForAllFormsTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
 
     @classmethod
     def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
         super().tearDownClass()
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.user = User.objects.create_user(username='viki')
         self.authorized_client.force_login(self.user)
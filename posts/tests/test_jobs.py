@@ -0,0 +1,136 @@
+import datetime as dt
+import threading
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import jobs
+from ..models import (Comment, Follow, Job, Likes, Post, TimelineEntry,
+                      UserStats)
+from ..search import search_posts
+from ..views import toggle_like
+
+
+def run_queue():
+    return jobs.work(threading.Event(), burst=True)
+
+
+class InlineJobsTest(TestCase):
+    def test_runs_immediately_without_queue(self):
+        author = get_user_model().objects.create_user('viki')
+        post = Post.objects.create(author=author, title='кошки', text='т')
+        Comment.objects.create(post=post, author=author, text='к')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(search_posts('кошки'), [post.pk])
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(JOBS_ASYNC=True)
+class QueuedJobsTest(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.author = User.objects.create_user('viki')
+        self.reader = User.objects.create_user('reader')
+        self.post = Post.objects.create(author=self.author, title='кошки',
+                                        text='текст')
+
+    def test_side_effects_wait_for_worker(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Likes.objects.create(user=self.reader, post=self.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(search_posts('кошки'), [])
+        self.assertEqual(run_queue(), (6, 0))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(search_posts('кошки'), [self.post.pk])
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post).exists())
+
+    def test_same_key_coalesces_while_queued(self):
+        for _ in range(3):
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text='к')
+        self.assertEqual(Job.objects.filter(name='counters.post').count(), 1)
+        run_queue()
+        Comment.objects.create(post=self.post, author=self.reader, text='к')
+        self.assertEqual(Job.objects.filter(name='counters.post').count(), 2)
+        run_queue()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+
+    def test_follow_then_unfollow_runs_once(self):
+        run_queue()
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(
+            Job.objects.filter(name='timeline.follow').count(), 1)
+        run_queue()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+
+    def test_toggle_like_returns_exact_count(self):
+        self.assertEqual(toggle_like(self.reader, self.post.pk), (True, 1))
+        self.assertEqual(toggle_like(self.reader, self.post.pk), (False, 0))
+
+
+@override_settings(JOBS_ASYNC=True, JOBS_RETRY_DELAY=10)
+class RetryTest(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        @jobs.task('test.flaky', max_attempts=2)
+        def flaky(fail):
+            self.calls.append(fail)
+            if fail:
+                raise ValueError('сбой')
+
+        self.addCleanup(jobs.TASKS.pop, 'test.flaky')
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue('test.flaky', fail=True)
+        self.assertEqual(run_queue(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('ValueError', job.last_error)
+        self.assertGreater(job.run_after,
+                           timezone.now() + dt.timedelta(seconds=5))
+        # задержка не прошла — воркер её не берёт
+        self.assertEqual(run_queue(), (0, 0))
+        Job.objects.update(run_after=timezone.now())
+        run_queue()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(self.calls, [True, True])
+
+    def test_claimed_job_is_not_claimed_again(self):
+        first = jobs.enqueue('test.flaky', key='a', fail=False)
+        second = jobs.enqueue('test.flaky', key='b', fail=False)
+        self.assertEqual(jobs.claim().pk, first.pk)
+        self.assertEqual(jobs.claim().pk, second.pk)
+        self.assertIsNone(jobs.claim())
+
+    def test_stale_running_job_is_requeued(self):
+        job = jobs.enqueue('test.flaky', fail=False)
+        Job.objects.update(status=Job.RUNNING,
+                           started=timezone.now() - dt.timedelta(days=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        run_queue()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_command_runs_queue_and_reports_stats(self):
+        jobs.enqueue('test.flaky', key='a', fail=False)
+        jobs.enqueue('test.flaky', key='b', fail=False)
+        out = StringIO()
+        call_command('run_jobs', burst=True, threads=1, stdout=out)
+        self.assertIn('Выполнено задач: 2, не удалось: 0', out.getvalue())
+        out = StringIO()
+        call_command('run_jobs', stats=True, stdout=out)
+        self.assertIn('test.flaky', out.getvalue())
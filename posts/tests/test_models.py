@@ -1,7 +1,11 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 
-from ..models import Group, Post, Comment, Follow, Profile
+from ..models import Group, Post, Comment, Follow, Likes, Profile, UserStats
 
 
 class ModelsTest(TestCase):
@@ -118,3 +122,50 @@ class ModelsTest(TestCase):
         expected = self.comment.text[:15]
         self.assertEqual(value, expected,
                          'Метод __str__ модели Comment работает не правильно.')
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='viki')
+        self.reader = get_user_model().objects.create_user(username='ivan')
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.post = Post.objects.create(author=self.user, text='текст',
+                                        title='заголовок')
+
+    def assertCounters(self, post=None, **stats):
+        for user, expected in stats.items():
+            values = UserStats.objects.values_list(
+                'posts_count', 'followers_count', 'following_count'
+            ).get(user__username=user)
+            self.assertEqual(values, expected)
+        if post is not None:
+            self.post.refresh_from_db()
+            self.assertEqual(
+                (self.post.likes_count, self.post.comments_count), post)
+
+    def test_views_maintain_counters(self):
+        args = [self.user.username, self.post.id]
+        self.client.get(reverse('likes', args=args), HTTP_REFERER='/')
+        self.client.post(reverse('add_comment', args=args), {'text': 'к'})
+        self.client.get(reverse('profile_follow', args=[self.user.username]))
+        self.assertCounters(post=(1, 1), viki=(1, 1, 0), ivan=(0, 0, 1))
+        self.client.get(reverse('likes', args=args), HTTP_REFERER='/')
+        self.client.get(reverse('profile_unfollow',
+                                args=[self.user.username]))
+        self.assertCounters(post=(0, 1), viki=(1, 0, 0), ivan=(0, 0, 0))
+
+    def test_cascade_delete_updates_counters(self):
+        Follow.objects.create(user=self.user, author=self.reader)
+        Likes.objects.create(user=self.reader, post=self.post)
+        self.assertCounters(viki=(1, 0, 1), ivan=(0, 1, 0))
+        self.user.delete()
+        self.assertCounters(ivan=(0, 0, 0))
+
+    def test_recount_command_repairs_drift(self):
+        Likes.objects.create(user=self.reader, post=self.post)
+        Post.objects.update(likes_count=10, comments_count=5)
+        UserStats.objects.filter(user=self.user).update(posts_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('recount_counters', stdout=StringIO())
+        self.assertCounters(post=(1, 0), viki=(1, 0, 0), ivan=(0, 0, 0))
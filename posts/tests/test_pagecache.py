@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.shortcuts import reverse
+from django.test import (RequestFactory, TransactionTestCase, Client,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Group, Post
+from ..pagecache import cacheable_response, page_key
+from ..views import toggle_like
+
+
+class PageCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user('viki')
+        self.group = Group.objects.create(title='Кошки', slug='cats')
+        self.post = Post.objects.create(author=self.author, title='пост',
+                                        text='первый', group=self.group)
+        self.client = Client()
+
+    def test_anonymous_pages_are_cached(self):
+        for url in (reverse('index'), reverse('group_posts', args=['cats']),
+                    reverse('profile', args=['viki']),
+                    reverse('post', args=['viki', self.post.pk]),
+                    reverse('all_groups'), reverse('about:author')):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first['X-Page-Cache'], 'miss')
+                with CaptureQueriesContext(connection) as queries:
+                    second = self.client.get(url)
+                self.assertEqual(second['X-Page-Cache'], 'hit')
+                self.assertEqual(len(queries), 0)
+                self.assertEqual(second.content, first.content)
+
+    def test_query_string_is_part_of_key(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'), {'page': 1})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_host_is_part_of_key(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'), HTTP_HOST='localhost')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_logged_in_users_bypass_cache(self):
+        self.client.force_login(self.author)
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'csrf-token')
+
+    def test_changes_invalidate_pages(self):
+        reader = get_user_model().objects.create_user('reader')
+        url = reverse('post', args=['viki', self.post.pk])
+        changes = {
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=reader, text='новый комментарий'),
+            'like': lambda: toggle_like(reader, self.post.pk),
+            'edit': lambda: Post.objects.filter(pk=self.post.pk).get().save(),
+            'group': lambda: Group.objects.get(pk=self.group.pk).save(),
+        }
+        for name, change in changes.items():
+            self.client.get(url)
+            change()
+            with self.subTest(change=name):
+                self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertContains(self.client.get(url), 'новый комментарий')
+
+    def test_login_does_not_invalidate_pages(self):
+        self.client.get(reverse('index'))
+        Client().force_login(self.author)
+        self.assertEqual(self.client.get(reverse('index'))['X-Page-Cache'],
+                         'hit')
+
+    def test_single_regeneration_serves_stale_meanwhile(self):
+        url = reverse('index')
+        self.client.get(url)
+        Post.objects.create(author=self.author, title='второй', text='т')
+        # пересборку уже ведёт другой запрос
+        request = RequestFactory().get(url)
+        cache.add(f'{page_key(request)}:lock', 1)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'второй')
+        cache.delete(f'{page_key(request)}:lock')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'второй')
+
+    @override_settings(PAGE_CACHE_WAIT_SECONDS=0)
+    def test_without_stale_copy_renders_uncached(self):
+        url = reverse('index')
+        cache.add(f'{page_key(RequestFactory().get(url))}:lock', 1)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertIsNone(cache.get(page_key(RequestFactory().get(url))))
+
+    def test_hit_answers_conditional_get(self):
+        url = reverse('index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_responses_with_cookies_are_not_cached(self):
+        request = RequestFactory().get('/')
+        response = HttpResponse('ok')
+        self.assertTrue(cacheable_response(request, response))
+        response.set_cookie('csrftoken', 'x')
+        self.assertFalse(cacheable_response(request, response))
+        request.META['CSRF_COOKIE_USED'] = True
+        self.assertFalse(cacheable_response(request, HttpResponse('ok')))
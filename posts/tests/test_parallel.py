@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+
+from yatube.asgi import application
+from yatube.routers import reading_from_replica, replica_reads
+
+from ..models import Follow, Post
+from .. import parallel
+from ..parallel import gather
+
+
+@override_settings(PARALLEL_QUERIES=True)
+class GatherTest(TransactionTestCase):
+    def test_results_in_order_from_other_threads(self):
+        threads = gather(*[threading.get_ident] * 3)
+        self.assertEqual(threads[0], threading.get_ident())
+        self.assertNotEqual(threads[1], threads[0])
+
+    def test_replica_reads_follow_to_workers(self):
+        with replica_reads(True):
+            self.assertEqual(gather(reading_from_replica,
+                                    reading_from_replica), [True, True])
+        self.assertFalse(reading_from_replica())
+
+    def test_concurrent_first_calls_share_one_pool(self):
+        self.addCleanup(setattr, parallel, '_executor', parallel._executor)
+        parallel._executor = None
+        start = threading.Barrier(8)
+        pools = []
+
+        def get():
+            start.wait()
+            pools.append(parallel._get_executor())
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, pools))), 1)
+        pools[0].shutdown()
+
+    @override_settings(PARALLEL_QUERIES=False)
+    def test_disabled_runs_in_current_thread(self):
+        self.assertEqual(set(gather(*[threading.get_ident] * 3)),
+                         {threading.get_ident()})
+
+
+@override_settings(PARALLEL_QUERIES=True)
+class GatherInTransactionTest(TestCase):
+    def test_atomic_block_runs_in_current_thread(self):
+        # другие соединения не видят незавершённую транзакцию теста
+        self.assertEqual(set(gather(*[threading.get_ident] * 3)),
+                         {threading.get_ident()})
+
+
+@override_settings(PARALLEL_QUERIES=True)
+class ParallelViewsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user('viki')
+        self.reader = get_user_model().objects.create_user('reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post = Post.objects.create(author=self.author, title='пост',
+                                        text='текст')
+        self.client.force_login(self.reader)
+
+    def test_profile(self):
+        response = self.client.get(reverse('profile', args=['viki']))
+        self.assertTrue(response.context['following'])
+        self.assertEqual(list(response.context['page']), [self.post])
+        self.assertEqual(response.context['card']['followers_count'], 1)
+
+    def test_post_view(self):
+        response = self.client.get(reverse('post',
+                                           args=['viki', self.post.pk]))
+        self.assertFalse(response.context['liked'])
+        self.assertEqual(response.context['card']['posts_count'], 1)
+
+
+class AsgiTest(SimpleTestCase):
+    def call(self, scope, body=b''):
+        messages = [{'type': 'http.request', 'body': body,
+                     'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(dict({
+            'type': 'http', 'method': 'GET', 'query_string': b'',
+            'headers': [(b'host', b'localhost')]}, **scope), receive, send))
+        return sent
+
+    def test_page(self):
+        start, body = self.call({'path': reverse('about:author')})
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      start['headers'])
+        self.assertIn('Об авторе'.encode(), body['body'])
+
+    def test_not_found_and_unicode_path(self):
+        start, _ = self.call({'path': '/about/нет/'})
+        self.assertEqual(start['status'], 404)
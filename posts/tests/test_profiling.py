@@ -0,0 +1,52 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, Client, override_settings
+
+from ..models import Post, RequestProfile
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user('author')
+        for i in range(3):
+            Post.objects.create(author=author, title=f'пост {i}', text='текст')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_recorded(self):
+        Client().get(reverse('index'))
+        sample = RequestProfile.objects.get()
+        self.assertEqual(sample.url_name, 'index')
+        self.assertEqual(sample.status, 200)
+        self.assertGreater(sample.sql_count, 0)
+        self.assertGreater(sample.template_ms, 0)
+        self.assertGreaterEqual(sample.wall_ms, sample.template_ms)
+        slow = json.loads(sample.slow_queries)
+        self.assertTrue(slow)
+        self.assertEqual(slow, sorted(slow, reverse=True))
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled_records_nothing(self):
+        Client().get(reverse('index'))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_report(self):
+        client = Client()
+        for _ in range(3):
+            client.get(reverse('index'))
+        client.get(reverse('profile', args=['author']))
+        out = StringIO()
+        call_command('profile_report', stdout=out)
+        report = out.getvalue()
+        self.assertIn('index', report)
+        self.assertIn('profile', report)
+        self.assertIn('Самые медленные запросы', report)
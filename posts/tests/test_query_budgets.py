@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import TestCase, Client
+
+from ..models import Comment, Follow, Group, Post
+from .budgets import QueryBudgetMixin, Recording
+
+
+class RecordingTest(TestCase):
+    def test_duplicates_and_violations(self):
+        recording = Recording('index')
+        recording.statements = [('SELECT 1', '()')] * 3 + [('SELECT 2', '()')]
+        self.assertEqual(recording.duplicates, 2)
+        self.assertEqual(recording.violations({'queries': 4}), [])
+        messages = recording.violations({'queries': 3, 'duplicates': 0})
+        self.assertEqual(len(messages), 3)
+        self.assertIn('3× SELECT 1', messages[-1])
+
+
+class PageBudgetTest(QueryBudgetMixin, TestCase):
+    """Страницы с несколькими постами, группами, подписками и
+    комментариями укладываются в бюджеты из query_budgets.json."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [get_user_model().objects.create_user(f'user{i}')
+                 for i in range(3)]
+        cls.reader = users[0]
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for author in users:
+            Follow.objects.create(user=cls.reader, author=author)
+            for i in range(4):
+                Post.objects.create(author=author, group=cls.group,
+                                    title=f'пост {i}', text='город')
+        cls.post = Post.objects.first()
+        for author in users:
+            Comment.objects.create(post=cls.post, author=author, text='к')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_pages_within_budget(self):
+        pages = {
+            'index': reverse('index'),
+            'group_posts': reverse('group_posts', args=['group']),
+            'profile': reverse('profile', args=['user1']),
+            'post': reverse('post', args=[self.post.author.username,
+                                          self.post.pk]),
+            'follow_index': reverse('follow_index'),
+            'search_results': reverse('search_results') + '?q=город',
+        }
+        for url_name, url in pages.items():
+            with self.subTest(url_name=url_name):
+                with self.assertWithinBudget(url_name):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve, reverse
+
+from yatube.routers import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter
+
+from ..models import Post
+
+
+@override_settings(REPLICA_DATABASE='replica')
+@mock.patch('yatube.routers.same_database', return_value=False)
+class ReplicaRouterTest(SimpleTestCase):
+    def route(self, method, path, cookies=None):
+        """База, из которой view читает Post, и ответ middleware."""
+        seen = []
+
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(Post))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        middleware = ReplicaMiddleware(view)
+        middleware.process_view(request, view, (), {})
+        response = middleware(request)
+        return seen[0], response
+
+    def test_read_only_pages_read_from_replica(self, same_database):
+        database, _ = self.route('get', reverse('index'))
+        self.assertEqual(database, 'replica')
+        self.assertEqual(ReplicaRouter().db_for_read(Post), 'default')
+
+    def test_other_pages_and_writes_use_primary(self, same_database):
+        database, _ = self.route('get', reverse('follow_index'))
+        self.assertEqual(database, 'default')
+        database, response = self.route('post', reverse('index'))
+        self.assertEqual(database, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(ReplicaRouter().db_for_write(Post), 'default')
+
+    def test_recent_writer_reads_from_primary(self, same_database):
+        database, _ = self.route('get', reverse('index'), {PIN_COOKIE: '1'})
+        self.assertEqual(database, 'default')
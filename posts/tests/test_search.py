@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+
+from ..models import Group, Post
+from ..search import get_backend, search_posts
+from ..search.backends import SQLiteFTSBackend, TableBackend
+from ..search.stemmer import stem
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        forms = {
+            'пост': ('посты', 'постов', 'постами'),
+            'подписчик': ('подписчики', 'подписчиков'),
+            'красив': ('красивая', 'красивейший'),
+        }
+        for expected, words in forms.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_non_cyrillic_words_are_kept(self):
+        self.assertEqual(stem('Django'), 'django')
+
+
+class SearchBackendsMixin:
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='viki')
+        self.group = Group.objects.create(title='Путешествия', slug='trips')
+        self.in_title = Post.objects.create(
+            author=self.user, title='Горные походы', text='Про отпуск')
+        self.in_text = Post.objects.create(
+            author=self.user, title='Заметка',
+            text='Летом ходили в горный поход', group=self.group)
+        self.other = Post.objects.create(
+            author=self.user, title='Рецепт', text='Пирог с яблоками')
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(search_posts('горный поход'),
+                         [self.in_title.pk, self.in_text.pk])
+
+    def test_matches_prefix_author_and_group(self):
+        self.assertEqual(search_posts('пиро'), [self.other.pk])
+        self.assertEqual(len(search_posts('viki')), 3)
+        self.assertEqual(search_posts('путешествиях'), [self.in_text.pk])
+
+    def test_index_follows_edit_and_delete(self):
+        self.other.text = 'Горный поход без пирогов'
+        self.other.save()
+        self.assertEqual(search_posts('пирог'), [self.other.pk])
+        self.assertEqual(len(search_posts('поход')), 3)
+        self.in_title.delete()
+        self.assertNotIn(self.in_title.pk, search_posts('поход'))
+
+    def test_index_follows_author_and_group_rename(self):
+        self.user.username = 'tanya'
+        self.user.save()
+        self.group.title = 'Экспедиции'
+        self.group.save()
+        self.assertEqual(len(search_posts('tanya')), 3)
+        self.assertEqual(search_posts('viki'), [])
+        self.assertEqual(search_posts('экспедиции'), [self.in_text.pk])
+
+    def test_rebuild_command(self):
+        get_backend().clear()
+        self.assertEqual(search_posts('поход'), [])
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(search_posts('поход')), 2)
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTSBackendTest(SearchBackendsMixin, TestCase):
+    def test_backend(self):
+        self.assertTrue(SQLiteFTSBackend.available())
+        self.assertIsInstance(get_backend(), SQLiteFTSBackend)
+
+
+@override_settings(SEARCH_BACKEND='table')
+class TableBackendTest(SearchBackendsMixin, TestCase):
+    def test_backend(self):
+        self.assertIsInstance(get_backend(), TableBackend)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = get_user_model().objects.create_user(username='viki')
+        for i in range(12):
+            Post.objects.create(author=user, title=f'Пост {i}',
+                                text='Про походы')
+
+    def test_results_are_paginated(self):
+        client = Client()
+        response = client.get(reverse('search_results'), {'q': 'поход'})
+        self.assertEqual(len(response.context['object_list']), 10)
+        self.assertContains(response,
+                            'q=%D0%BF%D0%BE%D1%85%D0%BE%D0%B4&page=2')
+        response = client.get(reverse('search_results'),
+                              {'q': 'поход', 'page': 2})
+        self.assertEqual(len(response.context['object_list']), 2)
+
+    def test_empty_query(self):
+        response = Client().get(reverse('search_results'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['object_list'], [])
@@ -0,0 +1,42 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from ..models import (Comment, Follow, Group, Likes, Post, TimelineEntry,
+                      User)
+
+
+class SeedTest(TestCase):
+    def seed(self, **options):
+        options = dict(users=50, groups=5, posts=400, follows=5, likes=5,
+                       comments=0.5, **options)
+        call_command('seed', stdout=StringIO(), **options)
+
+    def test_rows_and_counters(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertFalse(Post.objects.annotate(
+            actual=Count('likes')).exclude(likes_count=F('actual')).exists())
+        self.assertFalse(Post.objects.annotate(
+            actual=Count('comments')).exclude(
+                comments_count=F('actual')).exists())
+        self.assertEqual(
+            User.objects.get(username='seed1_user0').stats.following_count,
+            Follow.objects.filter(user__username='seed1_user0').count())
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_same_seed_same_data(self):
+        self.seed(seed=7)
+        first = list(Likes.objects.order_by('pk').values_list(
+            'user__username', 'post__title', 'post__group__slug'))
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(seed=7)
+        second = list(Likes.objects.order_by('pk').values_list(
+            'user__username', 'post__title', 'post__group__slug'))
+        self.assertEqual(first, second)
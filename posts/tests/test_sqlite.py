@@ -0,0 +1,45 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase
+
+from yatube.sqlite.base import DatabaseWrapper
+
+
+class TunedSqliteTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.wrapper = DatabaseWrapper({
+            'ENGINE': 'yatube.sqlite',
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+            'OPTIONS': settings.SQLITE_TUNING,
+            'TIME_ZONE': None, 'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False,
+        }, alias='tuned')
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+
+    def test_transactions_begin_immediate(self):
+        executed = []
+        self.wrapper.ensure_connection()
+        with self.wrapper.execute_wrapper(
+                lambda execute, sql, *args: executed.append(sql)
+                or execute(sql, *args)):
+            # так транзакцию начинает transaction.atomic
+            self.wrapper.set_autocommit(
+                False, force_begin_transaction_with_broken_autocommit=True)
+            self.wrapper.rollback()
+            self.wrapper.set_autocommit(True)
+        self.assertIn('BEGIN IMMEDIATE', executed)
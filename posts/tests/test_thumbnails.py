@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, Client, override_settings
+from PIL import Image
+
+from ..models import Post
+from ..thumbnails import ORIGINAL_MAX_SIZE, PLACEHOLDER, thumbnail_name
+
+
+def make_image(name='photo.png', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(THUMBNAIL_ASYNC=False)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user('viki')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_thumbnail_made_on_upload(self):
+        self.client.post(reverse('new_post'), {
+            'title': 'Фото', 'text': 'текст', 'image': make_image()})
+        post = Post.objects.get()
+        name = thumbnail_name(post.image.name, 'cover')
+        self.assertTrue(default_storage.exists(name))
+        with default_storage.open(name) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (960, 339))
+        self.assertContains(self.client.get(reverse('index')),
+                            default_storage.url(name))
+
+    def test_variants_for_srcset(self):
+        self.client.post(reverse('new_post'), {
+            'title': 'Фото', 'text': 'текст', 'image': make_image()})
+        post = Post.objects.get()
+        response = self.client.get(reverse('index'))
+        for width in (480, 960):
+            name = thumbnail_name(post.image.name, 'cover', width, 'webp')
+            with default_storage.open(name) as thumbnail:
+                self.assertEqual(Image.open(thumbnail).format, 'WEBP')
+            self.assertContains(response,
+                                f'{default_storage.url(name)} {width}w')
+
+    def test_original_capped_and_stripped(self):
+        image = Image.new('RGB', (4000, 1000), 'red')
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        self.client.post(reverse('new_post'), {
+            'title': 'Фото', 'text': 'текст',
+            'image': SimpleUploadedFile('big.jpg', buffer.getvalue(),
+                                        content_type='image/jpeg')})
+        with Post.objects.get().image.open() as original:
+            stored = Image.open(original)
+            self.assertEqual(stored.size, (ORIGINAL_MAX_SIZE, 640))
+            self.assertNotIn('exif', stored.info)
+
+    def test_placeholder_until_ready(self):
+        Post.objects.create(author=self.author, title='Фото', text='т',
+                            image=make_image())
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, PLACEHOLDER)
+
+    def test_command_renders_existing_images(self):
+        post = Post.objects.create(author=self.author, title='Фото',
+                                   text='т', image=make_image())
+        self.client.get(reverse('index'))
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('Готово картинок: 1', out.getvalue())
+        self.assertTrue(default_storage.exists(
+            thumbnail_name(post.image.name, 'cover')))
+        # карточка с заглушкой сброшена из кэша
+        self.assertNotContains(self.client.get(reverse('index')),
+                               PLACEHOLDER)
+
+    def test_command_keeps_cards_of_skipped_and_broken_images(self):
+        post = Post.objects.create(author=self.author, title='Фото',
+                                   text='т', image=make_image())
+        broken = Post.objects.create(
+            author=self.author, title='Битая', text='т',
+            image=SimpleUploadedFile('broken.jpg', b'not an image'))
+        call_command('generate_thumbnails', workers=1, stdout=StringIO(),
+                     stderr=StringIO())
+        versions = dict(Post.objects.values_list('pk', 'cache_version'))
+        out, err = StringIO(), StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out,
+                     stderr=err)
+        self.assertIn('Готово картинок: 0, уже были готовы: 1, с ошибкой: 1',
+                      out.getvalue())
+        self.assertIn(broken.image.name, err.getvalue())
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'cache_version')), versions)
+        self.assertTrue(default_storage.exists(
+            thumbnail_name(post.image.name, 'cover')))
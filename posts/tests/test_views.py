@@ -6,10 +6,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
 from django.shortcuts import reverse
-from django.test import TestCase, Client
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Follow, Group, Post
+from ..models import (Comment, Follow, Group, Likes, Post, Profile,
+                      TimelineEntry)
 
 
 class ViewsTests(TestCase):
@@ -33,6 +37,7 @@ class ViewsTests(TestCase):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_user = Client()
         self.authorized_user.force_login(self.user)
@@ -250,6 +255,23 @@ class ViewsTests(TestCase):
         count_following = Follow.objects.all().count()
         self.assertEqual(count_following, count_follow - 1)
 
+    def test_unfollow_without_follow(self):
+        response = self.authorized_user.get(
+            reverse('profile_unfollow', kwargs={'username': 'user2'}))
+        self.assertRedirects(response, reverse('profile', args=['user2']))
+
+    def test_follow_twice_keeps_one_row(self):
+        for _ in range(2):
+            self.authorized_user.get(reverse('profile_follow',
+                                     kwargs={'username': 'user2'}))
+        self.assertEqual(Follow.objects.filter(
+            user=self.user, author=self.user_2).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.user_2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            for _ in range(2):
+                Likes.objects.create(user=self.user_2, post=self.post)
+
 
 class PaginatorViewTest(TestCase):
     @classmethod
@@ -268,6 +290,7 @@ class PaginatorViewTest(TestCase):
                 group=cls.group)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_paginator_first_page(self):
@@ -277,3 +300,334 @@ class PaginatorViewTest(TestCase):
     def test_paginator_second_page(self):
         response = self.guest_client.get(reverse('index') + '?page=2')
         self.assertEqual(len(response.context.get('page').object_list), 3)
+
+    def test_cursor_pages_follow_each_other(self):
+        first = self.guest_client.get(reverse('index')).context['page']
+        self.assertFalse(first.has_previous())
+        second = self.guest_client.get(
+            reverse('index'), {'after': first.next_cursor}).context['page']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        back = self.guest_client.get(
+            reverse('index'), {'before': second.previous_cursor}
+        ).context['page']
+        self.assertListEqual(list(back), list(first))
+        self.assertListEqual(list(first) + list(second),
+                             list(Post.objects.all()))
+
+    def test_cursor_invalid_token_gives_first_page(self):
+        response = self.guest_client.get(reverse('index'), {'after': '!!'})
+        self.assertEqual(len(response.context['page']), 10)
+
+
+class FeedQueriesTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('viki')
+        self.reader = get_user_model().objects.create_user('reader')
+        Profile.objects.create(user=self.user, bio='текст')
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.group = Group.objects.create(
+            title='Название',
+            slug='test-1',
+            description='Текст')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'тестовый текст{i}',
+                author=self.user,
+                group=self.group)
+            Comment.objects.create(post=post, author=self.reader, text='к')
+            Likes.objects.create(post=post, user=self.reader)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.user.username]),
+            reverse('follow_index'),
+            reverse('search_results') + '?q=текст',
+        )
+        self.create_posts(1)
+        small_page = {url: self.count_queries(url) for url in urls}
+        self.create_posts(9)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small_page[url])
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user('viki')
+        self.reader = get_user_model().objects.create_user('reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.old_post = Post.objects.create(author=self.author, text='старый')
+
+    def feed(self):
+        response = self.client.get(reverse('follow_index'))
+        return list(response.context['page'])
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.client.get(reverse('profile_follow', args=['viki']))
+        new_post = Post.objects.create(author=self.author, text='новый')
+        self.assertListEqual(self.feed(), [new_post, self.old_post])
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader).count(), 2)
+
+    def test_unfollow_drops_author_posts(self):
+        self.client.get(reverse('profile_follow', args=['viki']))
+        self.client.get(reverse('profile_unfollow', args=['viki']))
+        self.assertListEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_LENGTH=2, TIMELINE_TRIM_INTERVAL=1)
+    def test_timeline_is_trimmed(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(author=self.author, text=str(i))
+                 for i in range(3)]
+        self.assertListEqual(
+            [entry.post for entry in TimelineEntry.objects.filter(
+                user=self.reader).order_by('-pub_date')],
+            posts[:0:-1])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_hot_authors_are_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='новый')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertListEqual(self.feed(), [new_post, self.old_post])
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user('viki')
+        self.reader = get_user_model().objects.create_user('reader')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.post = Post.objects.create(author=self.author, title='Заголовок',
+                                        text='первая версия')
+        self.edit_url = reverse('post_edit', args=['viki', self.post.id])
+
+    def test_card_is_shared_but_author_buttons_are_not(self):
+        self.reader_client.get(reverse('index'))
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, self.edit_url)
+        response = self.reader_client.get(reverse('index'))
+        self.assertContains(response, 'Первая версия')
+        self.assertNotContains(response, self.edit_url)
+
+    def test_edit_like_and_comment_invalidate_card(self):
+        self.reader_client.get(reverse('index'))
+        self.author_client.post(self.edit_url,
+                                {'title': 'Заголовок', 'text': 'вторая'})
+        self.assertContains(self.reader_client.get(reverse('index')),
+                            'Вторая')
+        self.reader_client.get(reverse('likes', args=['viki', self.post.id]),
+                               HTTP_REFERER='/')
+        self.reader_client.post(
+            reverse('add_comment', args=['viki', self.post.id]),
+            {'text': 'к'})
+        response = self.reader_client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0].cache_version, 3)
+        self.assertContains(response, 'fa-heart" href="{}" >\n1</a>'.format(
+            reverse('likes', args=['viki', self.post.id])))
+
+    def test_saved_post_holds_numeric_version(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        self.assertEqual(post.cache_version, 1)
+
+    def test_group_slug_change_invalidates_card(self):
+        group = Group.objects.create(title='Кошки', slug='cats')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        self.reader_client.get(reverse('index'))
+        group.slug = 'kittens'
+        group.save()
+        response = self.reader_client.get(reverse('index'))
+        self.assertContains(response, reverse('group_posts',
+                                              args=['kittens']))
+
+    def test_username_change_invalidates_card(self):
+        self.reader_client.get(reverse('index'))
+        self.author.username = 'vika'
+        self.author.save()
+        response = self.reader_client.get(reverse('index'))
+        self.assertContains(response, reverse('post',
+                                              args=['vika', self.post.id]))
+        self.assertNotContains(response, reverse('post',
+                                                 args=['viki', self.post.id]))
+
+
+class LikeToggleTest(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user('viki')
+        self.reader = get_user_model().objects.create_user('reader')
+        self.client.force_login(self.reader)
+        self.post = Post.objects.create(author=self.author, text='текст')
+        self.url = reverse('like_toggle', args=['viki', self.post.id])
+
+    def test_toggle_returns_state_and_count(self):
+        self.assertEqual(self.client.post(self.url).json(),
+                         {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.client.post(self.url).json(),
+                         {'liked': False, 'likes_count': 0})
+        self.assertFalse(Likes.objects.exists())
+
+    def test_toggle_does_not_render_page(self):
+        # сессия, пользователь, пост, сам лайк со счётчиком и транзакцией
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url)
+        self.assertLessEqual(len(queries), 11)
+
+    def test_anonymous_and_get_are_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertEqual(Client().post(self.url).status_code, 403)
+        self.assertFalse(Likes.objects.exists())
+
+
+@override_settings(THUMBNAIL_ASYNC=False)
+class PostCommentsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user('viki')
+        cls.post = Post.objects.create(author=cls.author, text='текст')
+        readers = [get_user_model().objects.create_user(f'reader{i}')
+                   for i in range(5)]
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=readers[i % 5],
+                                   text=f'комментарий {i}')
+            for i in range(25)][::-1]
+        cls.url = reverse('post', args=['viki', cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_is_newest_comments(self):
+        response = self.client.get(self.url)
+        page = response.context['comments']
+        self.assertListEqual(list(page), self.comments[:20])
+        self.assertContains(response, 'Показать ещё')
+
+    def test_load_more_renders_only_next_chunk(self):
+        page = self.client.get(self.url).context['comments']
+        response = self.client.get(
+            reverse('post_comments', args=['viki', self.post.id]),
+            {'comments_after': page.next_cursor})
+        self.assertListEqual(list(response.context['comments']),
+                             self.comments[20:])
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_queries_do_not_depend_on_comment_count(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        Comment.objects.bulk_create(
+            [Comment(post=self.post, author=self.author, text='ещё')] * 10)
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get(self.url)
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_viewer_like_state(self):
+        reader = get_user_model().objects.get(username='reader0')
+        Likes.objects.create(user=reader, post=self.post)
+        self.client.force_login(reader)
+        self.assertTrue(self.client.get(self.url).context['liked'])
+        self.client.force_login(self.author)
+        self.assertFalse(self.client.get(self.url).context['liked'])
+
+
+class FollowListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user('viki')
+        cls.readers = [get_user_model().objects.create_user(f'reader{i}')
+                       for i in range(25)]
+        for reader in cls.readers:
+            Profile.objects.create(user=reader)
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_followers_paginated_newest_first(self):
+        url = reverse('followers', args=['viki'])
+        response = self.client.get(url)
+        page = response.context['page']
+        self.assertListEqual([follow.user for follow in page],
+                             self.readers[:-21:-1])
+        self.assertContains(response, 'Подписчики (25)')
+        rest = self.client.get(url, {'after': page.next_cursor})
+        self.assertListEqual([follow.user for follow in rest.context['page']],
+                             self.readers[4::-1])
+
+    def test_queries_do_not_depend_on_page_size(self):
+        url = reverse('followers', args=['viki'])
+        cursor = self.client.get(url).context['page'].next_cursor
+        with CaptureQueriesContext(connection) as full_page:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as short_page:
+            self.client.get(url, {'after': cursor})
+        self.assertEqual(len(short_page), len(full_page))
+        self.assertLessEqual(len(full_page), 2)
+
+    def test_following(self):
+        response = self.client.get(reverse('following', args=['reader0']))
+        self.assertListEqual(
+            [follow.author for follow in response.context['page']],
+            [self.author])
+        self.assertContains(response, 'Подписки (1)')
+
+
+class AuthorDirectoryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [get_user_model().objects.create_user(f'author{i}')
+                       for i in range(25)]
+        for author in cls.authors:
+            Profile.objects.create(user=author)
+        get_user_model().objects.create_user('Autumn', first_name='Осень')
+
+    def test_directory_paginated_newest_first(self):
+        response = self.client.get(reverse('all_authors'))
+        page = response.context['page']
+        self.assertEqual(page[0].username, 'Autumn')
+        self.assertListEqual(list(page)[1:], self.authors[:-20:-1])
+        rest = self.client.get(reverse('all_authors'),
+                               {'after': page.next_cursor})
+        self.assertListEqual(list(rest.context['page']),
+                             self.authors[5::-1])
+
+    def test_profiles_joined(self):
+        self.client.get(reverse('all_authors'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('all_authors'))
+        self.assertEqual(len(queries), 1)
+
+    def test_filter_by_prefix(self):
+        response = self.client.get(reverse('all_authors'), {'q': 'author1'})
+        self.assertCountEqual(
+            [author.username for author in response.context['page']],
+            ['author1'] + [f'author1{i}' for i in range(10)])
+
+    def test_lookup(self):
+        response = self.client.get(reverse('author_lookup'), {'q': 'Au'})
+        self.assertEqual(response.json(), {'authors': [
+            {'username': 'Autumn', 'full_name': 'Осень'}]})
+        response = self.client.get(reverse('author_lookup'), {'q': 'author'})
+        self.assertEqual(len(response.json()['authors']), 10)
+        self.assertEqual(response.json()['authors'][0]['username'], 'author0')
+        response = self.client.get(reverse('author_lookup'))
+        self.assertEqual(response.json(), {'authors': []})
@@ -0,0 +1,191 @@
+"""Миниатюры картинок постов и аватаров.
+
+Миниатюры готовятся пулом потоков сразу после загрузки, а не при первом
+показе страницы, как делал sorl: страница не ждёт Pillow, а пока
+миниатюры нет, вместо неё отдаётся заглушка. Для каждой миниатюры
+сохраняется несколько ширин в JPEG и WebP для <picture> со srcset.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.functions import Now
+from django.templatetags.static import static
+from PIL import Image, ImageOps
+
+from .cache import PAGES, invalidate_on_commit
+from .jobs import enqueue
+
+
+logger = logging.getLogger(__name__)
+
+# size — наибольший размер (высота None — без кадрирования, с сохранением
+# пропорций), widths — ширины для srcset; каждая сохраняется в JPEG и WebP
+VARIANTS = {
+    'cover': {'size': (960, 339), 'widths': (480, 960)},
+    'avatar': {'size': (960, 960), 'widths': (128, 480, 960)},
+    'full': {'size': (1600, None), 'widths': (480, 960, 1600)},
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# какие миниатюры нужны файлам из каждого каталога upload_to
+SPECS = {
+    'posts': ('cover', 'full'),
+    'users': ('avatar',),
+}
+# оригиналы больше этого размера уменьшаются ещё при загрузке
+ORIGINAL_MAX_SIZE = 2560
+PLACEHOLDER = 'posts/placeholder.svg'
+
+_executor = None
+
+
+def specs_for(name):
+    return SPECS.get(name.split('/', 1)[0], ())
+
+
+def thumbnail_name(name, spec, width=None, extension='jpg'):
+    width = width or VARIANTS[spec]['widths'][-1]
+    return f'thumbs/{spec}/{os.path.splitext(name)[0]}-{width}.{extension}'
+
+
+def variants(name, spec):
+    """Адреса готовых вариантов {формат: [(ширина, url), ...]} или None,
+    пока они не готовы. Наибольший JPEG пишется последним, поэтому
+    проверяется только он."""
+    if not name or not default_storage.exists(thumbnail_name(name, spec)):
+        return None
+    return {
+        extension: [
+            (width, default_storage.url(
+                thumbnail_name(name, spec, width, extension)))
+            for width in VARIANTS[spec]['widths']
+        ]
+        for extension in FORMATS
+    }
+
+
+def thumbnail_url(name, spec):
+    """Адрес наибольшего JPEG или заглушки, если он ещё не готов."""
+    if not name:
+        return ''
+    target = thumbnail_name(name, spec)
+    if default_storage.exists(target):
+        return default_storage.url(target)
+    return static(PLACEHOLDER)
+
+
+def _resize(image, size):
+    width, height = size
+    if height is None:
+        # без кадрирования и без увеличения: у маленьких оригиналов файлы
+        # больших ширин совпадают с оригиналом по размеру
+        image = image.copy()
+        image.thumbnail((width, width * 10), Image.LANCZOS)
+        return image
+    return ImageOps.fit(image, size, Image.LANCZOS)
+
+
+def _encode(image, extension):
+    image_format, options = FORMATS[extension]
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render(name, spec, force=False):
+    variant = VARIANTS[spec]
+    target = thumbnail_name(name, spec)
+    if default_storage.exists(target) and not force:
+        return target
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source)).convert('RGB')
+    largest, height = variant['size']
+    image = _resize(image, variant['size'])
+    # от меньшего к большему, чтобы наибольший JPEG, по которому
+    # проверяется готовность, был записан последним
+    for width in sorted(variant['widths']):
+        size = (width, height and round(height * width / largest))
+        resized = image if width == largest else _resize(image, size)
+        for extension in FORMATS:
+            path = thumbnail_name(name, spec, width, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            default_storage.save(
+                path, ContentFile(_encode(resized, extension)))
+    return target
+
+
+def render_all(name, force=False):
+    return [render(name, spec, force) for spec in specs_for(name)]
+
+
+def prepare_original(upload):
+    """Убирает EXIF и прочие метаданные и уменьшает слишком большой
+    оригинал. Анимированные GIF и нераспознанные файлы не трогает."""
+    image = Image.open(upload)
+    image_format = image.format
+    if getattr(image, 'n_frames', 1) > 1 or image_format not in (
+            'JPEG', 'PNG', 'GIF', 'WEBP'):
+        upload.seek(0)
+        return upload
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+    image.save(buffer, image_format, **options)
+    return SimpleUploadedFile(upload.name, buffer.getvalue(),
+                              upload.content_type)
+
+
+def mark_ready(name):
+    """Сбрасывает кэш карточек, в которых вместо картинки была заглушка."""
+    from .models import Post
+
+    if name.startswith('posts/'):
+        posts = Post.objects.filter(image=name)
+    else:
+        posts = Post.objects.filter(author__profile__image=name)
+    posts.update(cache_version=F('cache_version') + 1, updated=Now())
+    invalidate_on_commit(PAGES)
+
+
+def _process(name):
+    try:
+        render_all(name)
+        mark_ready(name)
+    except Exception:
+        logger.exception('Не удалось сделать миниатюры для %s', name)
+    finally:
+        if settings.THUMBNAIL_ASYNC:
+            close_old_connections()
+
+
+def schedule(name):
+    """Ставит файл в очередь задач при JOBS_ASYNC, иначе в пул потоков;
+    при THUMBNAIL_ASYNC=False — сразу."""
+    global _executor
+    if not specs_for(name):
+        return
+    if settings.JOBS_ASYNC:
+        enqueue('thumbnails.render', key=name, name=name)
+        return
+    if not settings.THUMBNAIL_ASYNC:
+        _process(name)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails')
+    _executor.submit(_process, name)
@@ -0,0 +1,95 @@
+"""Лента подписок: fan-out при записи с fan-out при чтении для популярных.
+
+Новый пост раскладывается по TimelineEntry всех подписчиков автора, так
+что follow_index читает готовый список. Посты авторов, у которых больше
+TIMELINE_FANOUT_LIMIT подписчиков, не раскладываются — они подмешиваются
+в ленту при чтении.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def is_hot_author(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def trim_timeline(user_id):
+    """Оставляет в ленте только TIMELINE_LENGTH самых новых записей."""
+    entries = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id')
+    cutoff = entries.values_list('pub_date', 'post_id')[
+        settings.TIMELINE_LENGTH:settings.TIMELINE_LENGTH + 1]
+    for pub_date, post_id in cutoff:
+        entries.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date,
+                                         post_id__lte=post_id),
+        ).delete()
+
+
+def fan_out_post(post):
+    if is_hot_author(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).order_by(
+        'user_id').values_list('user_id', flat=True)
+    interval = settings.TIMELINE_TRIM_INTERVAL
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            followers.filter(user_id__gt=last_user_id)[:FANOUT_BATCH_SIZE])
+        if not user_ids:
+            return
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post.pk,
+                           pub_date=post.pub_date) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        # каждую ленту обрезаем примерно раз в interval новых записей,
+        # так что она не длиннее TIMELINE_LENGTH + interval
+        for user_id in user_ids:
+            if (user_id + post.pk) % interval == 0:
+                trim_timeline(user_id)
+        last_user_id = user_ids[-1]
+
+
+def backfill(user_id, author_id):
+    if is_hot_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts],
+        ignore_conflicts=True,
+    )
+    trim_timeline(user_id)
+
+
+def drop_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 post__author_id=author_id).delete()
+
+
+def timeline_posts(user):
+    """Queryset постов ленты подписок: разложенные и от популярных авторов."""
+    hot_authors = list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author', flat=True))
+    if not hot_authors:
+        # join от TimelineEntry: читается не больше TIMELINE_LENGTH строк
+        return Post.objects.filter(timeline_entries__user=user)
+    stored = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(Q(pk__in=stored) | Q(author__in=hot_authors))
+
+
+def fan_out_on_read(user):
+    """Прежний способ: join Follow и Post на каждый запрос."""
+    return Post.objects.filter(author__following__user=user)
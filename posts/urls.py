@@ -9,6 +9,7 @@ urlpatterns = [
     path('search/', views.search, name='search_results'),
     path('allgroups/', views.all_groups, name='all_groups'),
     path('allauthors/', views.all_authors, name='all_authors'),
+    path('allauthors/lookup/', views.author_lookup, name='author_lookup'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('newgroup/', views.new_group, name='new_group'),
     path('profile-settings/', views.profile_settings, name='profile_settings'),
@@ -20,6 +21,8 @@ urlpatterns = [
          name='post_edit'),
     path('<username>/<int:post_id>/comment', views.add_comment,
          name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('<str:username>/unfollow/', views.profile_unfollow,
@@ -33,6 +36,8 @@ urlpatterns = [
     path('<str:username>/groups/', views.author_groups, name='author_groups'),
     path('<str:username>/<int:post_id>/like/', views.likes,
          name='likes'),
+    path('<str:username>/<int:post_id>/like/toggle/', views.like_toggle,
+         name='like_toggle'),
     path('following/<str:username>/', views.following, name='following'),
     path('followers/<str:username>/', views.followers, name='followers'),
 ]
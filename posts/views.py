@@ -1,41 +1,164 @@
+import sys
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView
-from django.db.models import Q
 
+from .cache import (GROUPS, feed_page, group_listing, profile_card,
+                    profile_namespace)
+from .conditional import STAMP_FIELDS, conditional_page, stamp_posts
 from .forms import CommentForm, PostForm, GroupForm, ProfileForm
 from .models import Follow, Group, Post, User, Profile, Likes
+from .parallel import gather
+from .paginators import (CursorPage, CursorPaginator, WindowedPage,
+                         WindowedPaginator)
+from .search import search_posts
+from .timeline import timeline_posts
 
 
 DEFAULT_PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+FOLLOWS_PAGE_SIZE = 20
+AUTHORS_PAGE_SIZE = 20
+AUTHOR_LOOKUP_LIMIT = 10
+
+
+def offset_pages(request):
+    # ?page= оставлен для старых ссылок, по умолчанию — курсоры ?after=
+    return settings.FEED_PAGINATION == 'offset' or 'page' in request.GET
+
+
+def cursor_feed_page(request, paginator, feed):
+    """Страница ленты через кэш id: (запись кэша, страница, если она
+    только что построена, иначе None)."""
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    built = []
+
+    def build():
+        page = paginator.get_page(after=after, before=before)
+        built.append(page)
+        return {'ids': [post.pk for post in page],
+                'next': page.next_cursor, 'previous': page.previous_cursor}
+
+    cached = feed_page(feed, f'{after}:{before}', build)
+    return cached, built[0] if built else None
+
+
+def paginate_feed(request, post_list, feed=None):
+    if offset_pages(request):
+        paginator = WindowedPaginator(post_list, DEFAULT_PAGE_SIZE)
+        return paginator, paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(post_list, DEFAULT_PAGE_SIZE)
+    if feed is None:
+        return paginator, paginator.get_page(
+            after=request.GET.get('after'), before=request.GET.get('before'))
+    cached, page = cursor_feed_page(request, paginator, feed)
+    if page is not None:
+        return paginator, page
+    # в кэше только id: сами посты со свежими счётчиками читаем одним запросом
+    posts = post_list.in_bulk(cached['ids'])
+    page = CursorPage([posts[pk] for pk in cached['ids'] if pk in posts],
+                      paginator, cached['next'], cached['previous'])
+    return paginator, page
+
+
+def feed_stamp(request, post_list, feed, namespaces=()):
+    """Валидатор страницы ленты: те же посты, что покажет paginate_feed,
+    но только поля для ETag и без JOIN. Промах кэша id заполняет его и
+    для самой view."""
+    if offset_pages(request):
+        # страницы по номеру не кэшируются: валидатор стоил бы второго
+        # COUNT(*) и второго OFFSET на каждый ответ 200
+        return None
+    post_list = post_list.only(*STAMP_FIELDS)
+    cached, page = cursor_feed_page(
+        request, CursorPaginator(post_list, DEFAULT_PAGE_SIZE), feed)
+    if page is None:
+        page = post_list.filter(pk__in=cached['ids'])
+    return stamp_posts(list(page), namespaces)
+
+
+def index_stamp(request):
+    return feed_stamp(request, Post.objects.all(), 'index')
+
+
+def group_stamp(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return feed_stamp(request, Post.objects.filter(group=group_id),
+                      f'group:{group_id}', [GROUPS])
+
+
+def profile_stamp(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    # подписчики и подписки автора — в версии его профиля
+    return feed_stamp(request, Post.objects.filter(author=author_id),
+                      f'profile:{author_id}', [profile_namespace(author_id)])
+
+
+def post_stamp(request, username, post_id):
+    # новые комментарии и лайки меняют cache_version поста
+    post = Post.objects.filter(id=post_id, author__username=username).only(
+        *STAMP_FIELDS).first()
+    if post is None:
+        return None
+    return stamp_posts([post])
+
+
+def author_card(author):
+    def build():
+        card = User.objects.filter(pk=author.pk).values(
+            'first_name', 'last_name', 'profile__bio', 'profile__image',
+            'stats__posts_count', 'stats__followers_count',
+            'stats__following_count').get()
+        return {
+            'full_name': f"{card['first_name']} {card['last_name']}".strip(),
+            'bio': card['profile__bio'] or '',
+            'image': card['profile__image'] or '',
+            'posts_count': card['stats__posts_count'] or 0,
+            'followers_count': card['stats__followers_count'] or 0,
+            'following_count': card['stats__following_count'] or 0,
+        }
+
+    return profile_card(author.pk, build)
 
 
 def search(request):
-    query = request.GET.get('q')
-    object_list = Post.objects.filter(
-        Q(title__icontains=query) | Q(text__icontains=query) | Q(author__username__icontains=query) | Q (group__title__icontains=query)
-        )
-    return render(request,'search_results.html',
-            {'object_list': object_list, 'query': query})
-    
+    query = request.GET.get('q', '')
+    paginator = WindowedPaginator(search_posts(query), DEFAULT_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return render(request, 'search_results.html', {
+        'object_list': page.object_list, 'query': query, 'page': page,
+        'paginator': paginator, 'page_query': urlencode({'q': query})})
 
 
+@conditional_page(index_stamp)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, DEFAULT_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    paginator, page = paginate_feed(request, post_list, feed='index')
     return render(request, 'index.html', {
         'page': page, 'paginator': paginator})
 
 
+@conditional_page(group_stamp)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, DEFAULT_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = Post.objects.for_feed().filter(group=group)
+    paginator, page = paginate_feed(request, posts, feed=f'group:{group.pk}')
     return render(request, 'group.html', {
         'group': group, 'posts': posts, 'page': page,
         'paginator': paginator})
@@ -49,36 +172,65 @@ def new_post(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            form.save_m2m()
             return redirect('index')
         return render(request, 'new.html', {'form': form})
     form = PostForm()
     return render(request, 'new.html', {'form': form})
 
 
+@conditional_page(profile_stamp)
 def profile(request, username):
-    user = get_object_or_404(User, username=username) 
-    posts = user.posts.all()
-    paginator = Paginator(posts, DEFAULT_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user).exists()
-    return render(request, 'profile.html', {'author': user, 'page': page,
-                  'paginator': paginator, 'following': following})
+    user = get_object_or_404(User, username=username)
+    posts = Post.objects.for_feed().filter(author=user)
+    viewer = request.user if request.user.is_authenticated else None
+
+    def feed():
+        paginator, page = paginate_feed(request, posts,
+                                        feed=f'profile:{user.pk}')
+        page.object_list = list(page.object_list)
+        return paginator, page
+
+    def is_following():
+        return viewer is not None and Follow.objects.filter(
+            user=viewer, author=user).exists()
+
+    (paginator, page), following, card = gather(
+        feed, is_following, lambda: author_card(user))
+    return render(request, 'profile.html', {
+        'author': user, 'page': page, 'paginator': paginator,
+        'following': following, 'card': card})
 
 
+def comments_page(request, post):
+    """Страница комментариев, новые сверху, курсор — ?comments_after=."""
+    paginator = CursorPaginator(post.comments.select_related('author'),
+                                COMMENTS_PAGE_SIZE,
+                                ordering=('-created', '-id'))
+    return paginator.get_page(after=request.GET.get('comments_after'))
+
+
+@conditional_page(post_stamp)
 def post_view(request, username, post_id):
-    user = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    form = CommentForm()
-    comments = post.comments.all()
-    likes = post.likes.all()
+    post = get_object_or_404(Post.objects.for_feed(),
+                             id=post_id, author__username=username)
+    viewer = request.user if request.user.is_authenticated else None
+    liked, comments, card = gather(
+        lambda: viewer is not None and post.likes.filter(
+            user=viewer).exists(),
+        lambda: comments_page(request, post),
+        lambda: author_card(post.author))
     return render(request, 'post.html', {
-        'author': post.author, 'post': post, 'form': form,
-        'comments': comments, 'likes':likes})
+        'author': post.author, 'post': post, 'form': CommentForm(),
+        'comments': comments, 'liked': liked, 'card': card})
+
+
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             id=post_id, author__username=username)
+    return render(request, 'includes/comment_list.html', {
+        'post': post, 'comments': comments_page(request, post)})
 
 
 @login_required
@@ -92,7 +244,11 @@ def post_edit(request, username, post_id):
                     instance=post)
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            # не перезаписываем счётчики, изменённые параллельно
+            post = form.save(commit=False)
+            post.save(update_fields=PostForm.Meta.fields + (
+                'cache_version', 'updated'))
+            form.save_m2m()
             return redirect('post',
                             username=request.user.username,
                             post_id=post_id)
@@ -101,6 +257,7 @@ def post_edit(request, username, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentForm(request.POST or None)
@@ -114,16 +271,15 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = timeline_posts(request.user).for_feed()
     group_list = Group.objects.all()
-    paginator = Paginator(post_list, DEFAULT_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate_feed(request, post_list)
     return render(request, 'follow.html',
                   {'paginator': paginator, 'page': page, 'groups': group_list})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -132,9 +288,10 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('profile', username=username)
 
 
@@ -175,13 +332,43 @@ def group_edit(request, username, slug):
                   {'form': form, 'creator': creator, 'group': group})
 
 
+def with_activity(groups):
+    """Число постов и время последнего для групп страницы одним запросом."""
+    stats = {
+        row['group']: row for row in Post.objects.filter(
+            group__in=[group.pk for group in groups]).order_by()
+        .values('group').annotate(posts_count=Count('pk'),
+                                  last_post=Max('pub_date'))
+    }
+    for group in groups:
+        row = stats.get(group.pk, {})
+        group.posts_count = row.get('posts_count', 0)
+        group.last_post = row.get('last_post')
+    return groups
+
+
+def paginate_groups(request, group_list, listing):
+    paginator = WindowedPaginator(group_list, DEFAULT_PAGE_SIZE)
+    # count из кэша, чтобы paginator не делал COUNT(*) на каждый запрос
+    paginator.count = group_listing(
+        f'{listing}:count', lambda: {'count': paginator.count})['count']
+    # номер приводится к существующей странице до того, как попасть в
+    # ключ: ?page=abc и ?page=999 не плодят копий первой и последней
+    page = paginator.get_page(request.GET.get('page'))
+
+    def build():
+        return {'groups': with_activity(list(page.object_list))}
+
+    cached = group_listing(f'{listing}:{page.number}', build)
+    return paginator, WindowedPage(cached['groups'], page.number,
+                                   paginator)
+
+
 def all_groups(request):
-    group_list = Group.objects.all()
-    paginator = Paginator(group_list, DEFAULT_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate_groups(
+        request, Group.objects.select_related('creator'), 'all')
     return render(request, 'all_groups.html', {
-        'page': page, 'paginator': paginator, 'groups': group_list})
+        'page': page, 'paginator': paginator, 'groups': page})
 
 
 @login_required
@@ -195,6 +382,7 @@ def profile_settings(request):
 
 
 @login_required
+@transaction.atomic
 def post_delete(request, username, post_id):
     author = get_object_or_404(User, username=username)
     post = get_object_or_404(Post, author=author, id=post_id)
@@ -219,6 +407,7 @@ def group_delete(request, username, slug):
 
 
 @login_required
+@transaction.atomic
 def user_delete(request, username):
     user = get_object_or_404(User, username=username)
     if request.user != user:
@@ -230,39 +419,122 @@ def user_delete(request, username):
 
 def author_groups(request, username):
     creator = get_object_or_404(User, username=username)
-    groups = Group.objects.filter(creator__username=username)
-    return render(request, 'author_groups.html', {'creator': creator , 'groups': groups})
+    paginator, page = paginate_groups(
+        request, Group.objects.filter(creator=creator).select_related(
+            'creator'), f'creator:{creator.pk}')
+    return render(request, 'author_groups.html', {
+        'creator': creator, 'groups': page, 'page': page,
+        'paginator': paginator})
+
+
+@transaction.atomic
+def toggle_like(user, post_id):
+    """Ставит или снимает лайк, возвращает (лайк стоит, новый счётчик)."""
+    deleted, _ = Likes.objects.filter(user=user, post_id=post_id).delete()
+    liked = not deleted
+    if liked:
+        try:
+            with transaction.atomic():
+                Likes.objects.create(user=user, post_id=post_id)
+        except IntegrityError:
+            # параллельный запрос того же пользователя уже поставил лайк
+            pass
+    if settings.JOBS_ASYNC:
+        # счётчик в Post пересчитает фоновая задача, а ответу нужен точный
+        likes_count = Likes.objects.filter(post_id=post_id).count()
+    else:
+        likes_count = Post.objects.filter(pk=post_id).values_list(
+            'likes_count', flat=True).get()
+    return liked, likes_count
 
 
 @login_required
 def likes(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    if post.likes.filter(user=request.user.id).exists():
-        Likes.objects.get(user=request.user, post=post).delete()
-    else:
-        Likes.objects.get_or_create(user=request.user, post=post)
+    # без JavaScript: переключить и вернуться на страницу
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id,
+                             author__username=username)
+    toggle_like(request.user, post.pk)
     prewious_url = request.META.get('HTTP_REFERER')
-    return redirect(prewious_url)
+    return redirect(prewious_url or 'post', username=username,
+                    post_id=post_id)
+
+
+@require_POST
+def like_toggle(request, username, post_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Войдите, чтобы ставить лайки'},
+                            status=403)
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id,
+                             author__username=username)
+    liked, likes_count = toggle_like(request.user, post.pk)
+    return JsonResponse({'liked': liked, 'likes_count': likes_count})
+
+
+def authors_by_prefix(prefix):
+    """Пользователи, чьё имя начинается с prefix. Диапазон по username
+    идёт по индексу уникальности и в SQLite, где LIKE без учёта регистра
+    индекс не использует; startswith отсекает лишнее, если порядок
+    сортировки базы не совпадает с порядком кодов символов."""
+    authors = User.objects.filter(username__gte=prefix,
+                                  username__startswith=prefix)
+    if ord(prefix[-1]) < sys.maxunicode:
+        authors = authors.filter(
+            username__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return authors
+
 
 def all_authors(request):
-    author_list = User.objects.all().order_by('-date_joined')
-    paginator = Paginator(author_list, 20)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    query = request.GET.get('q', '').strip()
+    author_list = User.objects.select_related('profile')
+    if query:
+        author_list = authors_by_prefix(query).select_related('profile')
+    # новые сверху; курсор по (date_joined, id) идёт по индексу из
+    # миграции 0021, без OFFSET и COUNT(*)
+    paginator = CursorPaginator(author_list, AUTHORS_PAGE_SIZE,
+                                ordering=('-date_joined', '-id'))
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
     return render(request, 'all_authors.html', {
-        'page': page, 'paginator': paginator, 'author_list': author_list})
+        'page': page, 'paginator': paginator, 'author_list': page,
+        'query': query,
+        'page_query': urlencode({'q': query}) if query else ''})
+
+
+def author_lookup(request):
+    """Подсказки для поиска автора: ?q=начало имени."""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'authors': []})
+    authors = authors_by_prefix(query).order_by('username').values(
+        'username', 'first_name', 'last_name')[:AUTHOR_LOOKUP_LIMIT]
+    return JsonResponse({'authors': [
+        {'username': author['username'],
+         'full_name': f"{author['first_name']} {author['last_name']}".strip()}
+        for author in authors]})
+
+
+def follow_list(request, follows):
+    """Страница подписок: новые сверху, курсоры ?after= и ?before=."""
+    paginator = CursorPaginator(follows, FOLLOWS_PAGE_SIZE, ordering=('-id',))
+    return paginator, paginator.get_page(after=request.GET.get('after'),
+                                         before=request.GET.get('before'))
 
 
 def following(request, username):
-    author = get_object_or_404(User, username=username) 
-    followers = author.follower.all()
-    return render(request, 'following.html',{
-        'author': author, 'followers': followers,
+    author = get_object_or_404(User, username=username)
+    paginator, page = follow_list(
+        request, author.follower.select_related('author__profile'))
+    return render(request, 'following.html', {
+        'author': author, 'followers': page, 'page': page,
+        'paginator': paginator, 'card': author_card(author),
     })
 
+
 def followers(request, username):
-    author = get_object_or_404(User, username=username) 
-    followers = author.following.all()
-    return render(request, 'followers.html',{
-        'author': author, 'followers': followers,
+    author = get_object_or_404(User, username=username)
+    paginator, page = follow_list(
+        request, author.following.select_related('user__profile'))
+    return render(request, 'followers.html', {
+        'author': author, 'followers': page, 'page': page,
+        'paginator': paginator, 'card': author_card(author),
     })
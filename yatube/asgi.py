@@ -0,0 +1,128 @@
+"""ASGI-точка входа.
+
+    uvicorn yatube.asgi:application --workers 4
+
+В Django 2.2 нет ни ASGI-обработчика, ни асинхронных view, поэтому здесь
+то же WSGI-приложение обёрнуто в ASGI: тело запроса читается и ответ
+отправляется в цикле событий, а сам Django работает в пуле из
+ASGI_THREADS потоков. Медленный запрос (миниатюры, поиск) занимает поток
+пула, а не воркер целиком, а медленные клиенты не занимают и потока.
+Ответ собирается в памяти целиком: большие файлы отдаёт веб-сервер.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+wsgi_application = get_wsgi_application()
+
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # в WSGI путь — байты UTF-8, прочитанные как latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Соединения {scope['type']} не поддерживаются")
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_event_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self.run_wsgi, wsgi_environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def read_body(self, receive):
+        """Тело запроса или None, если клиент ушёл, не дослав его."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def run_wsgi(self, environ):
+        started = []
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+            return chunks.append
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            chunks.extend(result)
+        finally:
+            # request_finished: Django закрывает соединения с базой потока
+            if hasattr(result, 'close'):
+                result.close()
+        status, headers = started
+        return (int(status.split(' ', 1)[0]),
+                [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                 for name, value in headers],
+                b''.join(chunks))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def get_asgi_application():
+    from django.conf import settings
+
+    return WsgiToAsgi(wsgi_application, settings.ASGI_THREADS)
+
+
+application = get_asgi_application()
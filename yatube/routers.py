@@ -0,0 +1,88 @@
+"""Чтение с реплики.
+
+ReplicaMiddleware отмечает GET- и HEAD-запросы к страницам из
+REPLICA_VIEWS, и на время такого запроса ReplicaRouter отправляет чтение
+в базу REPLICA_DATABASE. Всё остальное, включая любую запись, идёт в
+default. После изменяющего запроса пользователь ещё REPLICA_LAG_SECONDS
+читает с основной базы (cookie), чтобы видеть свои изменения, даже если
+реплика отстаёт.
+"""
+import contextlib
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+PIN_COOKIE = 'yatube_primary'
+
+_state = threading.local()
+
+
+def reading_from_replica():
+    return getattr(_state, 'replica', False)
+
+
+@contextlib.contextmanager
+def replica_reads(enabled):
+    """Переносит отметку запроса в другой поток, см. posts.parallel."""
+    previous = reading_from_replica()
+    _state.replica = enabled
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def same_database(alias):
+    # так бывает в тестах, где реплика — зеркало default (TEST MIRROR):
+    # читаем из default, чтобы видеть данные незавершённой транзакции теста
+    replica = connections[alias].settings_dict
+    primary = connections['default'].settings_dict
+    return all(replica.get(key) == primary.get(key)
+               for key in ('NAME', 'HOST', 'PORT'))
+
+
+class ReplicaRouter:
+    # сессии всегда с основной базы: сессии, которой ещё нет в реплике,
+    # Django считает недействительной и разлогинивает пользователя
+    primary_apps = ('sessions',)
+
+    def db_for_read(self, model, **hints):
+        alias = settings.REPLICA_DATABASE
+        if (alias and reading_from_replica() and not same_database(alias)
+                and model._meta.app_label not in self.primary_apps):
+            return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # в реплике те же данные, что и в основной базе
+        return True
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.replica = False
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_LAG_SECONDS,
+                                httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.replica = (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.url_name in settings.REPLICA_VIEWS
+            and PIN_COOKIE not in request.COOKIES)
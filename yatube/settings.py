@@ -19,7 +19,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
     'about',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -27,15 +27,17 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'posts.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yatube.routers.ReplicaMiddleware',
+    'posts.pagecache.PageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,15 +64,71 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# uvicorn yatube.asgi:application — то же приложение за ASGI-сервером
+
+
+# YATUBE_SQLITE_TUNING=1 — профиль SQLite для рабочих установок, см.
+# yatube/sqlite/base.py: в WAL читатели не ждут писателя, synchronous=NORMAL
+# в WAL при сбое питания теряет только последние транзакции, но не
+# целостность; писатели ждут друг друга до busy_timeout
+SQLITE_TUNING = {
+    'transaction_mode': 'IMMEDIATE',
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # в КБ
+        'temp_store': 'MEMORY',
+    },
+}
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+def database_from_env(prefix):
+    """Настройки базы из переменных {prefix}_ENGINE, _NAME, _USER,
+    _PASSWORD, _HOST, _PORT, _CONN_MAX_AGE и _PGBOUNCER."""
+    engine = os.environ.get(f'{prefix}_ENGINE', 'sqlite3')
+    if engine == 'sqlite3':
+        name = os.environ.get(f'{prefix}_NAME',
+                              os.path.join(BASE_DIR, 'db.sqlite3'))
+        if os.environ.get('YATUBE_SQLITE_TUNING') == '1':
+            return {'ENGINE': 'yatube.sqlite', 'NAME': name,
+                    'OPTIONS': SQLITE_TUNING}
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    return {
+        # для postgresql нужен пакет psycopg2
+        'ENGINE': f'django.db.backends.{engine}',
+        'NAME': os.environ.get(f'{prefix}_NAME', 'yatube'),
+        'USER': os.environ.get(f'{prefix}_USER', ''),
+        'PASSWORD': os.environ.get(f'{prefix}_PASSWORD', ''),
+        'HOST': os.environ.get(f'{prefix}_HOST', ''),
+        'PORT': os.environ.get(f'{prefix}_PORT', ''),
+        # соединение живёт между запросами, а не открывается на каждый
+        'CONN_MAX_AGE': int(os.environ.get(f'{prefix}_CONN_MAX_AGE', 300)),
+        # за pgbouncer в режиме transaction серверные курсоры не работают
+        'DISABLE_SERVER_SIDE_CURSORS':
+            os.environ.get(f'{prefix}_PGBOUNCER') == '1',
     }
+
+
+DATABASES = {
+    'default': database_from_env('YATUBE_DB'),
 }
 
+# реплика для чтения включается переменной YATUBE_REPLICA_ENGINE или
+# YATUBE_REPLICA_NAME (для проверки на двух SQLite-файлах), см.
+# yatube/routers.py; в тестах она — зеркало default
+if 'YATUBE_REPLICA_ENGINE' in os.environ or \
+        'YATUBE_REPLICA_NAME' in os.environ:
+    DATABASES['replica'] = dict(database_from_env('YATUBE_REPLICA'),
+                                TEST={'MIRROR': 'default'})
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+# имена URL страниц, которые только читают
+REPLICA_VIEWS = ('index', 'group_posts', 'profile', 'post',
+                 'search_results', 'all_authors')
+REPLICA_LAG_SECONDS = 5
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +163,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# миниатюры готовятся в фоне после загрузки, см. posts/thumbnails.py
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# побочные эффекты записи (счётчики, поиск, лента подписок, миниатюры)
+# при YATUBE_JOBS_ASYNC=1 не выполняются в запросе, а ставятся в таблицу
+# Job и выполняются воркером manage.py run_jobs, см. posts/jobs.py;
+# счётчики и ленты тогда догоняют запись с задержкой очереди
+JOBS_ASYNC = os.environ.get('YATUBE_JOBS_ASYNC') == '1'
+JOBS_THREADS = 4
+JOBS_RETRY_DELAY = 5
+JOBS_RUNNING_TIMEOUT = 60 * 10
+
+# независимые запросы профиля и страницы поста — в пуле потоков, см.
+# posts/parallel.py; каждому потоку нужно своё соединение с базой
+PARALLEL_QUERIES = os.environ.get('YATUBE_PARALLEL_QUERIES') == '1'
+PARALLEL_QUERY_WORKERS = 8
+
+# потоки, в которых yatube/asgi.py выполняет запросы
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 32))
+
+# доля запросов, которые профилирует posts.profiling.ProfilingMiddleware:
+# 0 — middleware отключена, 1 — все запросы
+PROFILING_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILING', 0))
+PROFILING_SLOW_QUERIES = 5
+
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
 #LOGOUT_REDIRECT_URL = 'index'
@@ -112,9 +196,56 @@ LOGIN_REDIRECT_URL = 'index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
+# 'cursor' — keyset-пагинация лент по (pub_date, id), 'offset' — ?page=N
+FEED_PAGINATION = 'cursor'
+
+# 'auto' — SQLite FTS5, если доступна, иначе индекс в таблице SearchTerm
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 1000
+
+# длина хранимой ленты подписок и порог подписчиков, после которого посты
+# автора не раскладываются по лентам, а подмешиваются при чтении
+TIMELINE_LENGTH = 500
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_TRIM_INTERVAL = 50
+
+# locmem — свой кэш у каждого процесса (разработка, тесты);
+# filebased и memcached (в т. ч. через unix-сокет) общие для всех воркеров,
+# для memcached нужен пакет python-memcached
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'filebased': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   'unix:/tmp/memcached.sock'),
+    },
+}
+
+CACHES = {
+    'default': dict(CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+                    KEY_PREFIX='yatube'),
+}
+
+CACHE_TIMEOUTS = {
+    'feed_page': 60 * 10,
+    'profile_card': 60 * 60,
+    'group_listing': 60 * 10,
+    # страницы для анонимных посетителей; 0 отключает PageCacheMiddleware
+    'page': int(os.environ.get('YATUBE_PAGE_CACHE_TIMEOUT', 60 * 10)),
 }
 
+# имена URL страниц, которые анонимам отдаются из кэша целиком
+PAGE_CACHE_VIEWS = ('index', 'group_posts', 'profile', 'post', 'all_groups',
+                    'about:author', 'about:tech', 'about:soon')
+# пересборку страницы ведёт один запрос: блокировка на случай его падения
+# снимается сама; без старой версии остальные ждут не дольше WAIT
+PAGE_CACHE_LOCK_SECONDS = 30
+PAGE_CACHE_WAIT_SECONDS = 2
@@ -0,0 +1,31 @@
+"""SQLite с профилем для рабочих установок.
+
+ENGINE ``yatube.sqlite`` понимает в OPTIONS, кроме параметров
+sqlite3.connect:
+
+- ``pragmas`` — PRAGMA, которые выполняются на каждом новом соединении;
+- ``transaction_mode`` — например 'IMMEDIATE': транзакция сразу берёт
+  блокировку записи. С обычным BEGIN транзакция, которая сначала читает,
+  а потом пишет, при занятой базе получает «database is locked» сразу,
+  не дожидаясь busy_timeout.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')